@@ -1,7 +1,715 @@
 """Clase para creacion y administracion de un hotel.
     """
+import argparse
+import bisect
+import hashlib
 import json
 import os
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import date
+from functools import partial
+from itertools import islice
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows no tiene fcntl
+    fcntl = None
+
+import hotel_binary
+import room_search
+
+
+STORAGE_FORMAT = 2
+
+
+class SharedLock:
+    """Clase para representar un candado de lectores y escritor.
+    Las operaciones normales lo toman en modo compartido y pueden correr en
+    paralelo; un batch lo toma en modo exclusivo. El dueño del modo
+    exclusivo puede volver a tomarlo en cualquier modo.
+    """
+    def __init__(self):
+        """Inicializa una nueva instancia de la clase SharedLock.
+        """
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._owner = None
+        self._depth = 0
+
+    @contextmanager
+    def shared(self):
+        """Toma el candado en modo compartido.
+        """
+        with self._condition:
+            owned = self._owner == threading.get_ident()
+            if not owned:
+                while self._owner is not None:
+                    self._condition.wait()
+                self._shared += 1
+        try:
+            yield
+        finally:
+            if not owned:
+                with self._condition:
+                    self._shared -= 1
+                    if not self._shared:
+                        self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        """Toma el candado en modo exclusivo.
+        """
+        me = threading.get_ident()
+        with self._condition:
+            if self._owner == me:
+                self._depth += 1
+            else:
+                while self._owner is not None or self._shared:
+                    self._condition.wait()
+                self._owner = me
+                self._depth = 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._depth -= 1
+                if not self._depth:
+                    self._owner = None
+                    self._condition.notify_all()
+
+
+def _digest(snapshot):
+    """Funcion que calcula la huella de un snapshot.
+    """
+    return hashlib.sha1(snapshot).hexdigest()
+
+
+def _same_fragment(saved, fragment):
+    """Funcion que indica si dos fragmentos guardados tienen el mismo hotel;
+    los de snapshots JSON se comparan byte por byte.
+    """
+    if saved is None:
+        return False
+    if isinstance(saved, SnapshotSlice) and isinstance(fragment, SnapshotSlice):
+        return saved.read() == fragment.read()
+    return saved.data() == fragment.data()
+
+
+def _discard(index, key, value):
+    """Funcion que quita un valor de un indice de listas por llave.
+    """
+    values = index.get(key)
+    if values is None:
+        return
+    for position, item in enumerate(values):
+        if item is value:
+            del values[position]
+            break
+    if not values:
+        del index[key]
+
+
+def _intern(value):
+    """Funcion que comparte en memoria los textos que se repiten mucho.
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _check_type(name, value, types):
+    """Funcion que valida el tipo de un dato antes de modificar algo; los
+    booleanos no cuentan como numeros.
+    """
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise TypeError(f"Tipo inválido para {name}: {type(value).__name__}")
+
+
+def _check_room(room):
+    """Funcion que valida los tipos de una habitacion antes de agregarla.
+    """
+    _check_type("number", room.number, (int, str))
+    _check_type("room_type", room.room_type, str)
+    _check_type("capacity", room.capacity, int)
+    _check_type("price", room.price, (int, float))
+
+
+def normalize_name(value):
+    """Funcion que normaliza un nombre para buscarlo: sin acentos, sin
+    distinguir mayusculas y con un solo espacio entre palabras.
+    """
+    value = value.casefold()
+    if not value.isascii():
+        value = "".join(character for character in unicodedata.normalize("NFKD", value)
+                        if not unicodedata.combining(character))
+    return " ".join(value.split())
+
+
+def _parse_date(value):
+    """Funcion que convierte una fecha ISO (o None) en datetime.date.
+    """
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _format_date(value):
+    """Funcion que convierte una fecha en texto ISO para JSON.
+    """
+    return value.isoformat() if value is not None else None
+
+
+_read_lock = threading.Lock()
+
+
+def _read_at(fd, start, end):
+    """Funcion que lee un rango de bytes de un archivo abierto.
+    Usa os.pread para no depender de la posicion compartida del archivo.
+    """
+    if hasattr(os, "pread"):
+        return os.pread(fd, end - start, start)
+    with _read_lock:  # pragma: no cover - Windows no tiene os.pread
+        os.lseek(fd, start, os.SEEK_SET)
+        return os.read(fd, end - start)
+
+
+def _stat_key(stat):
+    """Funcion que identifica una version de un archivo por sus metadatos.
+    """
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _write_atomic(filename, data):
+    """Funcion que reemplaza un archivo sin que un lector lo vea a medias.
+    Escribe a un archivo temporal, hace fsync y lo renombra encima.
+    """
+    temporary = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+        stat = os.fstat(file.fileno())
+    os.replace(temporary, filename)
+    return stat
+
+
+def _encode_snapshot(header, hotels):
+    """Funcion que arma un snapshot JSON a partir de (fragmento, datos) por
+    hotel. Los hoteles con fragmento se copian del snapshot anterior y los
+    que quedaron juntos en el se leen de una sola vez.
+    Regresa los bytes y la posicion (inicio, fin) de cada hotel.
+    """
+    parts = [json.dumps(header, separators=(",", ":"))[:-1].encode('utf-8') + b',"hotels":[']
+    offset = len(parts[0])
+    spans = []
+    for position, (fragment, data) in enumerate(hotels):
+        if fragment is None:
+            data = json.dumps(data, separators=(",", ":")).encode('utf-8')
+            size = len(data)
+        else:
+            size = fragment.end - fragment.start
+        last = parts[-1]
+        if position and fragment is not None and isinstance(last, list) \
+                and last[0] is fragment.file and last[2] + 1 == fragment.start:
+            # Hotel contiguo al anterior en el snapshot viejo, coma incluida.
+            last[2] = fragment.end
+        else:
+            if position:
+                parts.append(b",")
+            parts.append(data if fragment is None
+                         else [fragment.file, fragment.start, fragment.end])
+        offset += 1 if position else 0
+        spans.append((offset, offset + size))
+        offset += size
+    parts.append(b"]}")
+    snapshot = b"".join(part if isinstance(part, bytes) else part[0].read(part[1], part[2])
+                        for part in parts)
+    return snapshot, spans
+
+
+def _encode_record(record):
+    """Funcion que serializa un registro del journal en una linea compacta.
+    """
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+class SnapshotFile:
+    """Clase para representar un snapshot abierto solo para lectura.
+    Los hoteles diferidos leen su fragmento de aqui; mientras alguno lo use
+    el archivo sigue abierto, aunque otro snapshot ya lo haya reemplazado.
+    """
+    def __init__(self, filename):
+        """Inicializa una nueva instancia de la clase SnapshotFile.
+        """
+        self.fd = os.open(filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+
+    def read(self, start, end):
+        """Metodo que lee los bytes [start, end) del archivo.
+        """
+        return _read_at(self.fd, start, end)
+
+    def __del__(self):
+        """Cierra el archivo cuando ya nadie lo usa.
+        """
+        os.close(self.fd)
+
+
+class SnapshotSlice:
+    """Clase para representar el JSON de un hotel dentro de un snapshot.
+    Mientras el hotel no cambie, el siguiente snapshot copia estos bytes en
+    lugar de volver a serializarlo; un hotel diferido se construye con ellos.
+    """
+    __slots__ = ("file", "start", "end")
+
+    def __init__(self, file, start, end):
+        """Inicializa una nueva instancia de la clase SnapshotSlice.
+        """
+        self.file = file
+        self.start = start
+        self.end = end
+
+    def read(self):
+        """Metodo que lee el JSON del hotel tal como esta en el snapshot.
+        """
+        return self.file.read(self.start, self.end)
+
+    def data(self):
+        """Metodo que interpreta el JSON del hotel.
+        """
+        return json.loads(self.read())
+
+
+class SnapshotScanner:
+    """Clase para representar la lectura incremental de un snapshot.
+    El archivo se lee por bloques y cada hotel se interpreta por separado,
+    de modo que nunca esta el documento completo en memoria. Los bytes se
+    decodifican como latin-1 para que cada caracter sea un byte y las
+    posiciones sirvan para volver a leer un hotel despues.
+    """
+    def __init__(self, file, chunk_size=1 << 20):
+        """Inicializa una nueva instancia de la clase SnapshotScanner.
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.base = 0
+        self.position = 0
+        self.eof = False
+        self.legacy = False
+        self.meta = {}
+        self._hash = hashlib.sha1()
+        self._decoder = json.JSONDecoder()
+
+    @property
+    def offset(self):
+        """Posicion en bytes dentro del archivo.
+        """
+        return self.base + self.position
+
+    def digest(self):
+        """Metodo que da la huella del archivo completo; lee lo que falte.
+        """
+        self.buffer = ""
+        self.base += self.position
+        self.position = 0
+        for data in iter(lambda: self.file.read(self.chunk_size), b""):
+            self._hash.update(data)
+        self.eof = True
+        return self._hash.hexdigest()
+
+    def _read(self):
+        """Metodo que agrega otro bloque al buffer descartando lo ya leido.
+        Cada lectura es al menos del tamano de lo pendiente, para que un
+        hotel muy grande no se vuelva a interpretar muchas veces.
+        """
+        if self.eof:
+            return False
+        data = self.file.read(max(self.chunk_size, len(self.buffer) - self.position))
+        if not data:
+            self.eof = True
+            return False
+        self._hash.update(data)
+        self.buffer = self.buffer[self.position:] + data.decode('latin-1')
+        self.base += self.position
+        self.position = 0
+        return True
+
+    def _peek(self):
+        """Metodo que salta espacios y regresa el siguiente caracter.
+        """
+        while True:
+            buffer = self.buffer
+            position = self.position
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            self.position = position
+            if position < len(buffer):
+                return buffer[position]
+            if not self._read():
+                return ""
+
+    def _expect(self, characters):
+        """Metodo que consume uno de los caracteres esperados.
+        """
+        character = self._peek()
+        if not character or character not in characters:
+            raise ValueError(f"Snapshot inválido en la posición {self.offset}.")
+        self.position += 1
+        return character
+
+    def _value(self):
+        """Metodo que interpreta el siguiente valor JSON completo.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._read():
+                    continue
+                raise
+            if end == len(self.buffer) and self._read():
+                # Un numero al final del bloque puede continuar en el siguiente.
+                continue
+            break
+        text = self.buffer[self.position:end]
+        self.position = end
+        if not text.isascii():
+            # Texto UTF-8 sin escapar: se vuelve a leer de sus bytes originales.
+            value = json.loads(text.encode('latin-1'))
+        return value
+
+    def hotels(self):
+        """Metodo que genera (inicio, fin, datos) por cada hotel.
+        Acepta la lista del formato anterior y el documento actual, cuyas
+        llaves previas a "hotels" quedan en meta.
+        """
+        character = self._peek()
+        if not character:
+            return
+        if character == "[":
+            self.legacy = True
+        else:
+            self._expect("{")
+            if self._peek() == "}":
+                return
+            while True:
+                key = self._value()
+                self._expect(":")
+                if key == "hotels":
+                    break
+                self.meta[key] = self._value()
+                if self._expect(",}") == "}":
+                    return
+            if self.meta.get("format") != STORAGE_FORMAT:
+                raise ValueError(f"Formato de archivo no soportado: {self.meta.get('format')}")
+        self._expect("[")
+        if self._peek() == "]":
+            return
+        while True:
+            self._peek()
+            start = self.offset
+            data = self._value()
+            yield start, self.offset, data
+            if self._expect(",]") == "]":
+                return
+
+
+class RoomTypeIndex:
+    """Clase para representar las habitaciones de un tipo ordenadas por precio.
+    Mantiene dos listas paralelas para poder usar bisect sobre los precios.
+    """
+    __slots__ = ("prices", "rooms")
+
+    def __init__(self):
+        """Inicializa una nueva instancia de la clase RoomTypeIndex.
+        """
+        self.prices = []
+        self.rooms = []
+
+    def add(self, room):
+        """Inserta una habitacion despues de las de igual precio.
+        """
+        position = bisect.bisect_right(self.prices, room.price)
+        self.prices.insert(position, room.price)
+        self.rooms.insert(position, room)
+
+    def remove(self, room):
+        """Elimina una habitacion buscandola entre las de su precio.
+        """
+        position = bisect.bisect_left(self.prices, room.price)
+        end = bisect.bisect_right(self.prices, room.price)
+        for position in range(position, end):
+            if self.rooms[position] is room:
+                del self.prices[position]
+                del self.rooms[position]
+                return
+
+    def search(self, min_price=None, max_price=None, min_capacity=None,
+               limit=None, offset=0):
+        """Consulta habitaciones en un rango de precio ordenadas por precio.
+        """
+        start = 0 if min_price is None else bisect.bisect_left(self.prices, min_price)
+        end = (len(self.prices) if max_price is None
+               else bisect.bisect_right(self.prices, max_price))
+        if min_capacity is None:
+            found = islice(self.rooms, start, end)
+        else:
+            found = (room for room in islice(self.rooms, start, end)
+                     if room.capacity >= min_capacity)
+        stop = None if limit is None else offset + limit
+        return list(islice(found, offset, stop))
+
+
+class RoomSchedule:
+    """Clase para representar las reservaciones de una habitacion.
+    Guarda los intervalos [check_in, check_out) ordenados por fecha de
+    entrada; como no se traslapan basta revisar los vecinos para saber si
+    un rango esta libre. Una reservacion sin fechas ocupa todo el tiempo.
+    """
+    __slots__ = ("starts", "ends", "reservations")
+
+    def __init__(self):
+        """Inicializa una nueva instancia de la clase RoomSchedule.
+        """
+        self.starts = []
+        self.ends = []
+        self.reservations = []
+
+    @staticmethod
+    def _bounds(check_in, check_out):
+        """Normaliza un rango de fechas abierto a los extremos del calendario.
+        """
+        return (check_in or date.min, check_out or date.max)
+
+    def add(self, reservation):
+        """Inserta una reservacion en orden de fecha de entrada.
+        """
+        start, end = self._bounds(reservation.check_in, reservation.check_out)
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.reservations.insert(position, reservation)
+
+    def remove(self, reservation):
+        """Elimina una reservacion del calendario.
+        """
+        start, _ = self._bounds(reservation.check_in, reservation.check_out)
+        position = bisect.bisect_left(self.starts, start)
+        while position < len(self.starts) and self.starts[position] == start:
+            if self.reservations[position] is reservation:
+                del self.starts[position]
+                del self.ends[position]
+                del self.reservations[position]
+                return
+            position += 1
+
+    @classmethod
+    def overlaps(cls, reservation, check_in=None, check_out=None):
+        """Indica si una sola reservacion se traslapa con el rango dado.
+        """
+        start, end = cls._bounds(check_in, check_out)
+        reserved_start, reserved_end = cls._bounds(reservation.check_in, reservation.check_out)
+        return reserved_start < end and reserved_end > start
+
+    def overlapping(self, check_in=None, check_out=None):
+        """Consulta una reservacion que se traslape con el rango dado.
+        """
+        start, end = self._bounds(check_in, check_out)
+        position = bisect.bisect_left(self.starts, end)
+        # El intervalo que empieza justo antes del fin del rango es el unico
+        # candidato posible porque los intervalos no se traslapan.
+        if position and self.ends[position - 1] > start:
+            return self.reservations[position - 1]
+        return None
+
+    def __len__(self):
+        """Numero de reservaciones de la habitacion.
+        """
+        return len(self.reservations)
+
+
+class GuestIndex:
+    """Clase para representar las reservaciones de la cadena por huesped.
+    Cada reservacion aparece una vez por palabra de su nombre normalizado,
+    con la llave desde esa palabra hasta el final ("ana garcia",
+    "garcia"), en dos listas paralelas ordenadas para usar bisect.
+    """
+    __slots__ = ("keys", "reservations", "names")
+
+    def __init__(self):
+        """Inicializa una nueva instancia de la clase GuestIndex.
+        """
+        self.keys = []
+        self.reservations = []
+        self.names = {}
+
+    @staticmethod
+    def _keys(name):
+        """Genera las llaves de un nombre normalizado.
+        """
+        keys = [name] if name else []
+        position = name.find(" ")
+        while position != -1:
+            keys.append(name[position + 1:])
+            position = name.find(" ", position + 1)
+        return keys
+
+    def add(self, reservation):
+        """Inserta una reservacion despues de las de igual llave.
+        """
+        name = normalize_name(reservation.guest_name)
+        self.names.setdefault(name, []).append(reservation)
+        for key in self._keys(name):
+            position = bisect.bisect_right(self.keys, key)
+            self.keys.insert(position, key)
+            self.reservations.insert(position, reservation)
+
+    def extend(self, reservations):
+        """Agrega muchas reservaciones ordenando una sola vez.
+        """
+        keys = self.keys
+        found = self.reservations
+        for reservation in reservations:
+            name = normalize_name(reservation.guest_name)
+            self.names.setdefault(name, []).append(reservation)
+            for key in self._keys(name):
+                keys.append(key)
+                found.append(reservation)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[position] for position in order]
+        self.reservations = [found[position] for position in order]
+
+    def remove(self, reservation):
+        """Elimina una reservacion buscandola entre las de cada llave.
+        """
+        name = normalize_name(reservation.guest_name)
+        same_name = self.names.get(name, [])
+        for position, candidate in enumerate(same_name):
+            if candidate is reservation:
+                del same_name[position]
+                break
+        if not same_name:
+            self.names.pop(name, None)
+        for key in self._keys(name):
+            start = bisect.bisect_left(self.keys, key)
+            end = bisect.bisect_right(self.keys, key)
+            for position in range(start, end):
+                if self.reservations[position] is reservation:
+                    del self.keys[position]
+                    del self.reservations[position]
+                    break
+
+    def search(self, name, prefix=False):
+        """Consulta las reservaciones de un huesped.
+        Sin prefix el nombre completo debe coincidir; con prefix basta con
+        que alguna palabra del nombre, y las que le siguen, empiecen con el
+        texto buscado. Los resultados salen en orden alfabetico.
+        """
+        query = normalize_name(name)
+        if not prefix:
+            return list(self.names.get(query, ()))
+        if not query:
+            return []
+        start = bisect.bisect_left(self.keys, query)
+        found = {}
+        for position in range(start, len(self.keys)):
+            if not self.keys[position].startswith(query):
+                break
+            found.setdefault(self.reservations[position], None)
+        return list(found)
+
+
+class HotelTable:
+    """Clase para representar los hoteles de la cadena por id.
+    Un dict id -> hotel conserva el orden de insercion y da consulta y
+    eliminacion por id en O(1). El acceso por posicion, que queda por
+    compatibilidad, usa una lista que se reconstruye despues de eliminar o
+    insertar; iterar recorre esa lista, de modo que un cambio concurrente
+    no interrumpe a quien esta iterando.
+    """
+    __slots__ = ("_hotels", "_sequence")
+
+    def __init__(self, hotels=()):
+        """Inicializa una nueva instancia de la clase HotelTable.
+        """
+        self._hotels = {}
+        self._sequence = None
+        self.extend(hotels)
+
+    def _list(self):
+        """Metodo que da los hoteles en orden como lista.
+        """
+        sequence = self._sequence
+        if sequence is None:
+            sequence = self._sequence = list(self._hotels.values())
+        return sequence
+
+    def __len__(self):
+        """Numero de hoteles.
+        """
+        return len(self._hotels)
+
+    def __iter__(self):
+        """Recorre los hoteles en orden.
+        """
+        return iter(self._list())
+
+    def __getitem__(self, position):
+        """Consulta un hotel por su posicion (desde 0, como en una lista).
+        """
+        return self._list()[position]
+
+    def __contains__(self, hotel):
+        """Indica si el hotel, y no solo su id, esta en la tabla.
+        """
+        return self._hotels.get(getattr(hotel, "hotel_id", None)) is hotel
+
+    def get(self, hotel_id, default=None):
+        """Metodo que consulta un hotel por id.
+        """
+        return self._hotels.get(hotel_id, default)
+
+    def index(self, hotel):
+        """Metodo que da la posicion de un hotel; recorre la lista.
+        """
+        return self._list().index(hotel)
+
+    def append(self, hotel):
+        """Metodo que agrega un hotel al final.
+        """
+        if hotel.hotel_id in self._hotels:
+            raise ValueError(f"Ya existe un hotel con id {hotel.hotel_id}.")
+        self._hotels[hotel.hotel_id] = hotel
+        if self._sequence is not None:
+            self._sequence.append(hotel)
+
+    def extend(self, hotels):
+        """Metodo que agrega varios hoteles al final.
+        """
+        for hotel in hotels:
+            self.append(hotel)
+
+    def insert(self, position, hotel):
+        """Metodo que agrega un hotel en una posicion; reconstruye el dict,
+        por lo que solo se usa para deshacer una eliminacion.
+        """
+        if hotel.hotel_id in self._hotels:
+            raise ValueError(f"Ya existe un hotel con id {hotel.hotel_id}.")
+        sequence = list(self._list())
+        sequence.insert(position, hotel)
+        self._hotels = {other.hotel_id: other for other in sequence}
+        self._sequence = sequence
+
+    def pop(self, hotel_id):
+        """Metodo que elimina un hotel por id y lo regresa.
+        """
+        hotel = self._hotels.pop(hotel_id)
+        self._sequence = None
+        return hotel
 
 
 class Hotel:
@@ -9,18 +717,257 @@ class Hotel:
     Esta clase contiene información sobre el hotel, como su nombre,
     la lista de habitaciones disponibles, las reservas realizadas, etc.
     """
-    def __init__(self, name, location, rooms, reservations=None):
+    __slots__ = ("name", "location", "_rooms", "_reservations", "lock",
+                 "_rooms_by_number", "_rooms_by_type", "_schedules", "_loader",
+                 "_fragment", "generation", "hotel_id")
+
+    def __init__(self, name, location, rooms, reservations=None, loader=None,
+                 fragment=None, hotel_id=None):
         """Inicializa una nueva instancia de la clase Hotel.
+        Con loader el hotel es diferido: sus habitaciones y reservaciones se
+        construyen al llamar loader(hotel) la primera vez que se consultan.
+        fragment es el SnapshotSlice con el JSON del hotel ya guardado.
+        hotel_id lo asigna el HotelManager y no cambia aunque se eliminen
+        otros hoteles.
         """
+        self.hotel_id = hotel_id
         self.name = name
-        self.location = location
-        self.rooms = rooms
-        self.reservations = reservations if reservations is not None else []
+        self.location = _intern(location)
+        self._rooms = rooms
+        self._reservations = reservations if reservations is not None else []
+        self.lock = threading.RLock()
+        self._rooms_by_number = {}
+        self._rooms_by_type = {}
+        self._schedules = {}
+        for room in self._rooms:
+            self._index_room(room)
+        for reservation in self._reservations:
+            self._index_reservation(reservation)
+        self._loader = loader
+        self._fragment = fragment
+        self.generation = 0
+
+    @property
+    def rooms(self):
+        """Habitaciones del hotel.
+        """
+        if self._loader is not None:
+            self.load()
+        return self._rooms
+
+    @property
+    def reservations(self):
+        """Reservaciones del hotel.
+        """
+        if self._loader is not None:
+            self.load()
+        return self._reservations
+
+    @property
+    def dirty(self):
+        """Indica si el hotel cambio desde el ultimo snapshot.
+        """
+        return self._fragment is None
+
+    def mark_dirty(self):
+        """Metodo que descarta el JSON guardado del hotel y aumenta su
+        generacion, con la que se invalidan las consultas guardadas en cache.
+        Lo llaman los metodos que lo modifican; quien cambie atributos
+        directamente debe llamarlo para que el cambio se guarde.
+        """
+        self._fragment = None
+        self.generation += 1
+
+    @property
+    def loaded(self):
+        """Indica si ya se construyeron las habitaciones y reservaciones.
+        """
+        return self._loader is None
+
+    def load(self):
+        """Metodo que construye un hotel diferido; en otro caso no hace nada.
+        """
+        loader = self._loader
+        if loader is not None:
+            loader(self)
+
+    def _fill(self, data):
+        """Metodo que agrega las habitaciones y reservaciones de un diccionario.
+        """
+        for room_data in data['rooms']:
+            room = Room(**room_data)
+            self._rooms.append(room)
+            self._index_room(room)
+        for reservation_data in data.get('reservations', []):
+            reservation = Reservation.from_dict(reservation_data, self)
+            self._reservations.append(reservation)
+            self._index_reservation(reservation)
+
+    def _index_room(self, room):
+        """Agrega una habitacion a los indices por tipo y por numero.
+        El indice por tipo va primero: es el que compara precios y puede
+        fallar, y asi un error no deja la habitacion a medias.
+        """
+        type_index = self._rooms_by_type.get(room.room_type)
+        if type_index is None:
+            type_index = self._rooms_by_type[room.room_type] = RoomTypeIndex()
+        type_index.add(room)
+        # Casi todos los numeros son unicos: se guarda la habitacion y solo
+        # un numero repetido usa una lista.
+        current = self._rooms_by_number.get(room.number)
+        if current is None:
+            self._rooms_by_number[room.number] = room
+        elif isinstance(current, list):
+            current.append(room)
+        else:
+            self._rooms_by_number[room.number] = [current, room]
+
+    def _index_reservation(self, reservation):
+        """Agrega una reservacion al calendario de su habitacion.
+        Una habitacion con una sola reservacion guarda la reservacion; el
+        RoomSchedule se crea cuando llega la segunda.
+        """
+        room = reservation.room
+        if isinstance(room, Room):
+            current = self._schedules.get(room)
+            if current is None:
+                self._schedules[room] = reservation
+            elif isinstance(current, RoomSchedule):
+                current.add(reservation)
+            else:
+                schedule = RoomSchedule()
+                schedule.add(current)
+                schedule.add(reservation)
+                self._schedules[room] = schedule
+
+    def add_room(self, room):
+        """Agrega una habitacion al hotel manteniendo los indices.
+        """
+        if self._loader is not None:
+            self.load()
+        self.mark_dirty()
+        self._index_room(room)
+        self._rooms.append(room)
+
+    def remove_room(self, room):
+        """Elimina una habitacion del hotel manteniendo los indices.
+        """
+        if self._loader is not None:
+            self.load()
+        self.mark_dirty()
+        self._rooms.remove(room)
+        current = self._rooms_by_number.get(room.number)
+        if current is room:
+            del self._rooms_by_number[room.number]
+        elif isinstance(current, list):
+            _discard(self._rooms_by_number, room.number, room)
+            if len(current) == 1:
+                self._rooms_by_number[room.number] = current[0]
+        type_index = self._rooms_by_type.get(room.room_type)
+        if type_index is not None:
+            type_index.remove(room)
+            if not type_index.rooms:
+                del self._rooms_by_type[room.room_type]
+
+    def add_reservation(self, reservation):
+        """Agrega una reservacion al hotel manteniendo los indices.
+        """
+        if self._loader is not None:
+            self.load()
+        self.mark_dirty()
+        self._index_reservation(reservation)
+        self._reservations.append(reservation)
+
+    def remove_reservation(self, reservation):
+        """Elimina una reservacion del hotel manteniendo los indices.
+        """
+        if self._loader is not None:
+            self.load()
+        self.mark_dirty()
+        self._reservations.remove(reservation)
+        room = reservation.room
+        current = self._schedules.get(room) if isinstance(room, Room) else None
+        if current is reservation:
+            del self._schedules[room]
+        elif isinstance(current, RoomSchedule):
+            current.remove(reservation)
+            if len(current) == 1:
+                self._schedules[room] = current.reservations[0]
+
+    def _replace(self, other):
+        """Metodo que toma el contenido de otro hotel leido del disco; este
+        objeto se conserva para que sigan valiendo las referencias a el.
+        """
+        self.name = other.name
+        self.location = other.location
+        self._rooms = other._rooms
+        self._reservations = other._reservations
+        self._rooms_by_number = other._rooms_by_number
+        self._rooms_by_type = other._rooms_by_type
+        self._schedules = other._schedules
+        self._loader = other._loader
+        self._fragment = other._fragment
+        for reservation in self._reservations:
+            reservation.hotel = self
+        self.generation += 1
+
+    def room_by_number(self, number):
+        """Consulta la primera habitacion con el numero dado.
+        Las consultas de esta clase toman el candado del hotel, el mismo con
+        el que se modifican sus indices.
+        """
+        if self._loader is not None:
+            self.load()
+        with self.lock:
+            return self._room_by_number(number)
+
+    def _room_by_number(self, number):
+        """Consulta una habitacion sin tomar el candado del hotel; la usan
+        la carga y el journal, que ya tienen el candado del administrador.
+        """
+        rooms = self._rooms_by_number.get(number)
+        return rooms[0] if isinstance(rooms, list) else rooms
+
+    def search_rooms(self, room_type, min_price=None, max_price=None,
+                     min_capacity=None, limit=None, offset=0):
+        """Consulta habitaciones de un tipo ordenadas por precio.
+        """
+        if self._loader is not None:
+            self.load()
+        with self.lock:
+            type_index = self._rooms_by_type.get(room_type)
+            if type_index is None:
+                return []
+            return type_index.search(min_price, max_price, min_capacity, limit, offset)
+
+    def reservation_for_room(self, room, check_in=None, check_out=None):
+        """Consulta una reservacion de la habitacion que ocupe el rango dado.
+        Sin fechas cualquier reservacion de la habitacion cuenta.
+        """
+        if not isinstance(room, Room):
+            return None
+        if self._loader is not None:
+            self.load()
+        with self.lock:
+            schedule = self._schedules.get(room)
+            if schedule is None:
+                return None
+            check_in = _parse_date(check_in)
+            check_out = _parse_date(check_out)
+            if isinstance(schedule, RoomSchedule):
+                return schedule.overlapping(check_in, check_out)
+            return schedule if RoomSchedule.overlaps(schedule, check_in, check_out) else None
+
+    def is_available(self, room, check_in, check_out):
+        """Indica si la habitacion esta libre en el rango dado.
+        """
+        return self.reservation_for_room(room, check_in, check_out) is None
 
     def to_dict(self):
         """Conversion de un objeto a Diccionario.
         """
         return {
+            "hotel_id": self.hotel_id,
             "name": self.name,
             "location": self.location,
             "rooms": [room.to_dict() for room in self.rooms],
@@ -31,11 +978,12 @@ class Hotel:
     @classmethod
     def from_dict(cls, data):
         """Inicializa de objetos apartir de diccionarios.
+        Acepta tanto el formato normalizado como el anterior, en el que cada
+        reservacion traia una copia de la habitacion y del hotel.
         """
-        rooms = [Room(**room_data) for room_data in data['rooms']]
-        reservations = [Reservation(**reservation_data)
-                        for reservation_data in data.get('reservations', [])]
-        return cls(data['name'], data['location'], rooms, reservations)
+        hotel = cls(data['name'], data['location'], [], hotel_id=data.get('hotel_id'))
+        hotel._fill(data)
+        return hotel
 
 
 class Room:
@@ -43,11 +991,13 @@ class Room:
     Esta clase contiene información sobre la habitacion, como su capacidad,
     precio, numero de habitacion y tipo.
     """
+    __slots__ = ("number", "room_type", "capacity", "price")
+
     def __init__(self, number, room_type, capacity, price):
         """Inicializa una nueva instancia de la clase Room.
         """
         self.number = number
-        self.room_type = room_type
+        self.room_type = _intern(room_type)
         self.capacity = capacity
         self.price = price
 
@@ -73,72 +1023,1038 @@ class Reservation:
     Esta clase contiene información sobre la reservacion, hotel
     habitacion, huesped.
     """
-    def __init__(self, reservation_id, hotel, room, guest_name):
+    __slots__ = ("reservation_id", "hotel", "room", "guest_name",
+                 "check_in", "check_out")
+
+    def __init__(self, reservation_id, hotel, room, guest_name,
+                 check_in=None, check_out=None):
         """Inicializa una nueva instancia de la clase Reservation.
+        Las fechas son datetime.date o texto ISO; check_out es exclusivo.
         """
         self.reservation_id = reservation_id
         self.hotel = hotel
         self.room = room
         self.guest_name = guest_name
+        self.check_in = _parse_date(check_in)
+        self.check_out = _parse_date(check_out)
+        if (self.check_in is not None and self.check_out is not None
+                and self.check_in >= self.check_out):
+            raise ValueError("La fecha de salida debe ser posterior a la de entrada.")
 
     def to_dict(self):
         """Conversion de un objeto a Diccionario.
+        La habitacion se guarda por numero y el hotel queda implicito por
+        el hotel que contiene la reservacion.
         """
-        room_data = self.room.to_dict() if isinstance(self.room, Room)\
-            else self.room
         return {
             "reservation_id": self.reservation_id,
-            "hotel": {
-                "name": self.hotel.name,
-                "location": self.hotel.location
-            },
-            "room": room_data,
-            "guest_name": self.guest_name
+            "room": self.room_number,
+            "guest_name": self.guest_name,
+            "check_in": _format_date(self.check_in),
+            "check_out": _format_date(self.check_out)
         }
 
+    @property
+    def room_number(self):
+        """Numero de la habitacion reservada.
+        """
+        if isinstance(self.room, Room):
+            return self.room.number
+        if isinstance(self.room, dict):
+            return self.room.get("number")
+        return self.room
+
+    @classmethod
+    def from_dict(cls, data, hotel):
+        """Inicializa una reservacion resolviendo su habitacion en el hotel.
+        Si la habitacion no existe se conserva la referencia original.
+        """
+        room = data['room']
+        number = room.get("number") if isinstance(room, dict) else room
+        resolved = hotel._room_by_number(number)
+        return cls(data['reservation_id'], hotel,
+                   resolved if resolved is not None else room,
+                   data['guest_name'], data.get('check_in'), data.get('check_out'))
+
+
+class QueryCache:
+    """Clase para representar un cache LRU de resultados de consultas.
+    Cada resultado se guarda con la generacion de los datos de los que
+    depende; si al consultarlo la generacion ya cambio se vuelve a calcular.
+    """
+    def __init__(self, capacity=1024):
+        """Inicializa una nueva instancia de la clase QueryCache.
+        Con capacity=0 no se guarda nada.
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generation, compute):
+        """Metodo que regresa el resultado guardado para key o lo calcula con
+        compute(). La generacion se lee antes de calcular, de modo que un
+        cambio durante el calculo deja el resultado como obsoleto.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        result = compute()
+        if self.capacity > 0:
+            with self._lock:
+                self._entries[key] = (generation, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        """Metodo que descarta todos los resultados guardados.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Metodo que consulta los contadores del cache.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "size": len(self._entries),
+                    "capacity": self.capacity}
+
+
+class Metrics:
+    """Clase para representar la instrumentacion de los administradores.
+    Cuenta las llamadas y guarda un histograma de latencias por metodo, y
+    acumula contadores como los bytes escritos por guardado. sink, si se da,
+    recibe cada medicion como sink(tipo, nombre, valor) con tipo "timing" o
+    "count". profiler, si se da, envuelve la llamada mas externa de cada
+    metodo instrumentado como profiler(llamada) y regresa su resultado, por
+    ejemplo cProfile.Profile().runcall; llamada es un functools.partial
+    cuyo func es el metodo.
+    """
+    # Limites superiores de cada barra del histograma, en segundos.
+    BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)
+
+    def __init__(self, sink=None, profiler=None):
+        """Inicializa una nueva instancia de la clase Metrics.
+        """
+        self.sink = sink
+        self.profiler = profiler
+        self._timings = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, name, seconds):
+        """Metodo que registra la duracion de una operacion.
+        """
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = [0, 0.0, 0.0, [0] * (len(self.BUCKETS) + 1)]
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+            timing[3][bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        if self.sink is not None:
+            self.sink("timing", name, seconds)
+
+    def count(self, name, amount=1):
+        """Metodo que suma amount a un contador.
+        """
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                counter = self._counters[name] = [0, 0]
+            counter[0] += 1
+            counter[1] += amount
+        if self.sink is not None:
+            self.sink("count", name, amount)
+
+    @contextmanager
+    def measure(self, name):
+        """Metodo que mide el bloque que envuelve.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def wrap(self, name, function):
+        """Metodo que envuelve una funcion para medir cada llamada.
+        Sirve para instrumentar cualquier operacion, no solo las de los
+        administradores.
+        """
+        local = self._local
+
+        def instrumented(*args, **kwargs):
+            depth = getattr(local, "depth", 0)
+            local.depth = depth + 1
+            started = time.perf_counter()
+            try:
+                if depth == 0 and self.profiler is not None:
+                    return self.profiler(partial(function, *args, **kwargs))
+                return function(*args, **kwargs)
+            finally:
+                local.depth = depth
+                self.observe(name, time.perf_counter() - started)
+        instrumented.__wrapped__ = function
+        instrumented.__doc__ = function.__doc__
+        return instrumented
+
+    def instrument(self, target, names=None):
+        """Metodo que instrumenta los metodos de un objeto reemplazandolos en
+        la instancia; sin names se usan los de target.INSTRUMENTED. Los
+        objetos sin instrumentar no pagan ningun costo.
+        """
+        prefix = type(target).__name__
+        for name in names if names is not None else target.INSTRUMENTED:
+            setattr(target, name, self.wrap(f"{prefix}.{name}", getattr(target, name)))
+
+    def stats(self):
+        """Metodo que da una copia de las mediciones.
+        Cada operacion tiene llamadas, tiempo total, maximo y el histograma
+        como {limite en segundos: llamadas}; cada contador tiene registros y
+        total.
+        """
+        bounds = [str(bound) for bound in self.BUCKETS] + ["inf"]
+        with self._lock:
+            operations = {
+                name: {"calls": calls, "total": total, "max": maximum,
+                       "histogram": {bound: amount for bound, amount in zip(bounds, histogram)
+                                     if amount}}
+                for name, (calls, total, maximum, histogram) in self._timings.items()}
+            counters = {name: {"calls": calls, "total": total}
+                        for name, (calls, total) in self._counters.items()}
+        return {"operations": operations, "counters": counters}
+
+    def reset(self):
+        """Metodo que descarta las mediciones.
+        """
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
 
 class HotelManager:
     """Clase para representar la adminstracion del Hotel.
+    Es segura para usarse desde varios hilos: las reservaciones de un hotel
+    se serializan con el candado del hotel, los cambios en memoria con un
+    candado corto del administrador y la escritura a disco con un candado
+    propio, de modo que la serializacion JSON no bloquea otras operaciones.
     """
-    def __init__(self, filename):
+    INSTRUMENTED = (
+        "load_hotels", "save_hotels", "refresh", "create_hotel", "delete_hotel",
+        "add_room", "create_reservation", "find_reservation", "find_available_rooms",
+        "delete_hotel_by_id", "get_hotel", "search_hotels_by_location", "search_rooms",
+        "get_hotel_by_index",
+        "search_reservations_by_hotel", "search_reservation_by_id",
+        "search_reservations_by_guest",
+    )
+
+    def __init__(self, filename, journal=False, journal_limit=1000, shared=False,
+                 lazy=False, binary=False, cache_size=1024, metrics=None, upgrade=True):
         """Inicializa una nueva instancia de la clase Hotel Manager.
+        Con journal=True cada operacion se agrega como un registro al
+        archivo '<filename>.journal' en lugar de reescribir todo el archivo;
+        al llegar a journal_limit registros el journal se compacta.
+        Con shared=True varios procesos pueden escribir el mismo archivo:
+        cada escritura toma un candado de archivo y antes incorpora lo que
+        otros procesos hayan escrito.
+        Con lazy=True al abrir solo se indexan nombre y ubicacion de cada
+        hotel; sus habitaciones y reservaciones se construyen la primera vez
+        que se consultan.
+        Con binary=True los snapshots se escriben en el formato binario de
+        hotel_binary; el formato de un archivo existente se detecta al leerlo.
+        cache_size es el numero de consultas que se guardan en query_cache.
+        Con metrics (una instancia de Metrics) se instrumentan los metodos de
+        INSTRUMENTED y el guardado; stats() da las mediciones.
+        Con upgrade=False un archivo del formato anterior o con hoteles sin
+        id no se reescribe al abrirlo; los ids asignados solo quedan en
+        memoria hasta el siguiente guardado.
         """
         self.filename = filename
+        self.journal = journal
+        self.journal_limit = journal_limit
+        self.journal_filename = filename + ".journal"
+        self.shared = shared
+        self.lazy = lazy
+        self.binary = binary
+        self.upgrade = upgrade
+        self._snapshot_digest = _digest(b"")
+        self._snapshot_key = None
+        self._version = 0
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._gate = SharedLock()
+        self._lock = threading.RLock()
+        self._save_lock = threading.RLock()
+        self._local = threading.local()
+        self._file_lock = None
+        self._file_lock_depth = 0
+        self._outbox = deque()
+        self._mutations = 0
+        self._saved_version = 0
+        self._last_reservation_id = 0
+        self._last_hotel_id = 0
+        self._unloaded = False
+        self._loading = None
+        self._reservation_ids_known = True
+        self._hotel_order = {}
+        self._next_order = 0
+        self._hotels_by_location = {}
+        self._reservations_by_id = {}
+        self._duplicate_reservations = {}
+        self._room_search = None
+        self._guest_index = None
+        self._previous_hotels = {}
+        self.generation = 0
+        self.query_cache = QueryCache(cache_size)
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.instrument(self)
         self.hotels = self.load_hotels()
         self.reservations = []
 
     def load_hotels(self):
         """Metodo que abre el archivo Json con la informacion  guardada.
+        El archivo se interpreta hotel por hotel; despues de cargar el
+        snapshot aplica las operaciones pendientes del journal.
+        Al recargar, los hoteles que siguen en el archivo conservan su objeto.
+        """
+        with self._save_lock, self._gate.exclusive():
+            self._previous_hotels = {hotel.hotel_id: hotel
+                                     for hotel in getattr(self, "hotels", ())}
+            self.hotels = []
+            self._snapshot_key = None
+            try:
+                legacy, meta, digest = self._read_snapshot()
+            finally:
+                self._previous_hotels = {}
+            missing_ids = self._assign_hotel_ids(meta)
+            self.hotels = HotelTable(self.hotels)
+            self._version = meta.get("version", 0)
+            self._rebuild_indexes(meta.get("orders"))
+            self._last_reservation_id = max(self._last_reservation_id,
+                                            meta.get("last_reservation_id", 0))
+            self._reservation_ids_known = not self._unloaded \
+                or "last_reservation_id" in meta
+            self._outbox.clear()
+            self._snapshot_digest = digest
+            self._journal_offset = 0
+            self._journal_entries = 0
+            self._read_journal()
+            self._saved_version = self._mutations
+            for hotel in missing_ids:
+                if isinstance(hotel._fragment, SnapshotSlice):
+                    # Su JSON guardado no trae el id: se construye para
+                    # serializarlo de nuevo y el archivo se reescribe.
+                    hotel.load()
+                    hotel.mark_dirty()
+                    legacy = True
+            if legacy and self.upgrade:
+                # Los archivos del formato anterior se reescriben normalizados.
+                self.save_hotels()
+        return self.hotels
+
+    def _assign_hotel_ids(self, meta):
+        """Metodo que da id a los hoteles recien leidos que no lo tienen (o
+        que lo repiten), en orden y despues del mayor id conocido, de modo
+        que el mismo snapshot siempre produce los mismos ids.
+        Regresa los hoteles que recibieron id.
+        """
+        last_hotel_id = max([meta.get("last_hotel_id", 0)]
+                            + [hotel.hotel_id for hotel in self.hotels
+                               if isinstance(hotel.hotel_id, int)])
+        seen = set()
+        missing = []
+        for hotel in self.hotels:
+            if not isinstance(hotel.hotel_id, int) or hotel.hotel_id in seen:
+                last_hotel_id += 1
+                hotel.hotel_id = last_hotel_id
+                missing.append(hotel)
+            seen.add(hotel.hotel_id)
+        self._last_hotel_id = last_hotel_id
+        return missing
+
+    def _read_snapshot(self):
+        """Metodo que agrega a self.hotels los hoteles del snapshot.
+        Regresa (es_anterior, encabezado, huella) del snapshot.
+        """
+        if not os.path.exists(self.filename):
+            return False, {}, _digest(b"")
+        snapshot_file = SnapshotFile(self.filename)
+        self._snapshot_key = _stat_key(os.fstat(snapshot_file.fd))
+        if snapshot_file.read(0, len(hotel_binary.MAGIC)) == hotel_binary.MAGIC:
+            meta, digest = self._load_binary(snapshot_file)
+            return False, meta, digest
+        with os.fdopen(os.dup(snapshot_file.fd), 'rb') as file:
+            scanner = SnapshotScanner(file)
+            for start, end, hotel_data in scanner.hotels():
+                if scanner.legacy:
+                    self.hotels.append(Hotel.from_dict(hotel_data))
+                else:
+                    self.hotels.append(self._snapshot_hotel(
+                        hotel_data, SnapshotSlice(snapshot_file, start, end)))
+            return scanner.legacy, scanner.meta, scanner.digest()
+
+    def _snapshot_hotel(self, hotel_data, fragment):
+        """Metodo que crea un hotel leido de un snapshot; con lazy solo se
+        usan su nombre y ubicacion.
+        """
+        def build():
+            if self.lazy:
+                return Hotel(hotel_data['name'], hotel_data['location'], [],
+                             loader=self._load_hotel, fragment=fragment,
+                             hotel_id=hotel_data.get('hotel_id'))
+            hotel = Hotel.from_dict(hotel_data)
+            hotel._fragment = fragment
+            return hotel
+        return self._reuse_hotel(hotel_data.get('hotel_id'), fragment, build)
+
+    def _reuse_hotel(self, hotel_id, fragment, build):
+        """Metodo que, al recargar, conserva el objeto del hotel con ese id:
+        si su contenido guardado no cambio solo toma el fragmento nuevo y si
+        cambio toma el contenido de build(). Sin hotel previo regresa build().
+        """
+        previous = self._previous_hotels.pop(hotel_id, None)
+        if previous is None:
+            return build()
+        with previous.lock:
+            if _same_fragment(previous._fragment, fragment):
+                previous._fragment = fragment
+            else:
+                previous._replace(build())
+        return previous
+
+    def _load_binary(self, snapshot_file):
+        """Metodo que abre un snapshot binario con mmap.
+        Regresa los datos del encabezado y la huella del snapshot.
+        """
+        snapshot = hotel_binary.BinarySnapshot(snapshot_file.fd)
+        for index, (name, location, hotel_id) in enumerate(snapshot.hotels()):
+            fragment = snapshot.hotel(index)
+
+            def build(name=name, location=location, hotel_id=hotel_id, fragment=fragment):
+                if self.lazy:
+                    return Hotel(name, location, [], loader=self._load_hotel,
+                                 fragment=fragment, hotel_id=hotel_id)
+                hotel = Hotel.from_dict(fragment.data())
+                hotel._fragment = fragment
+                return hotel
+            self.hotels.append(self._reuse_hotel(hotel_id, fragment, build))
+        meta = {"version": snapshot.version,
+                "last_reservation_id": snapshot.last_reservation_id,
+                "last_hotel_id": snapshot.last_hotel_id}
+        return meta, snapshot.digest
+
+    def refresh(self):
+        """Metodo que incorpora los cambios escritos por otros procesos.
+        Si solo crecio el journal se aplican unicamente los registros
+        nuevos; si el snapshot fue reemplazado se vuelve a leer, pero solo
+        se construyen los hoteles que cambiaron y los demas conservan su
+        objeto. Regresa True si hubo cambios.
+        """
+        with self._save_lock:
+            return self._refresh()
+
+    def _refresh(self):
+        """Metodo que compara el estado en disco con el cargado.
+        """
+        try:
+            snapshot_key = _stat_key(os.stat(self.filename))
+        except FileNotFoundError:
+            snapshot_key = None
+        if snapshot_key != self._snapshot_key:
+            self.load_hotels()
+            return True
+        try:
+            journal_size = os.path.getsize(self.journal_filename)
+        except FileNotFoundError:
+            journal_size = 0
+        if journal_size == self._journal_offset:
+            return False
+        if journal_size < self._journal_offset:
+            self.load_hotels()
+            return True
+        with self._gate.exclusive():
+            return self._read_journal() > 0
+
+    @contextmanager
+    def _storage_transaction(self):
+        """Metodo que protege una escritura contra otros procesos.
+        Sin shared no hace nada. Con shared toma el candado de archivo,
+        incorpora los cambios de otros procesos y lo conserva hasta que la
+        operacion se persiste.
+        """
+        if not self.shared:
+            yield
+            return
+        with self._save_lock:
+            outermost = self._file_lock_depth == 0
+            if outermost:
+                self._acquire_file_lock()
+            self._file_lock_depth += 1
+            try:
+                if outermost:
+                    self._refresh()
+                yield
+            finally:
+                self._file_lock_depth -= 1
+                if outermost:
+                    self._release_file_lock()
+
+    def _acquire_file_lock(self):
+        """Metodo que toma el candado consultivo '<filename>.lock'.
         """
-        hotels = []
-        if os.path.exists(self.filename):
-            with open(self.filename, 'r', encoding='utf-8') as file:
-                hotels_data = json.load(file)
-                for hotel_data in hotels_data:
-                    hotel = Hotel.from_dict(hotel_data)
-                    hotels.append(hotel)
-        return hotels
+        if self._file_lock is None:
+            self._file_lock = open(self.filename + ".lock", 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file_lock.fileno(), fcntl.LOCK_EX)
+
+    def _release_file_lock(self):
+        """Metodo que libera el candado de archivo.
+        """
+        if fcntl is not None:
+            fcntl.flock(self._file_lock.fileno(), fcntl.LOCK_UN)
 
     def save_hotels(self):
         """Metodo que almacena Hoteles.
+        Escribe un snapshot completo y descarta el journal ya incorporado.
         """
-        hotels_data = []
-        for hotel in self.hotels:
-            hotel_data = hotel.to_dict()
-            hotel_data["reservations"] = [reservation.to_dict() for reservation in hotel.reservations]
-            hotels_data.append(hotel_data)
+        with self._storage_transaction(), self._save_lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """Metodo que escribe el snapshot; requiere el candado de escritura.
+        Solo se serializan los hoteles que cambiaron, con el candado del
+        administrador tomado; en JSON los demas se copian del snapshot
+        anterior. Al final cada hotel apunta a su posicion en el nuevo.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            version = self._mutations
+            hotels = []
+            for hotel in self.hotels:
+                fragment = hotel._fragment
+                if not self.binary and isinstance(fragment, SnapshotSlice):
+                    hotels.append((hotel, hotel.generation, fragment, None))
+                else:
+                    hotels.append((hotel, hotel.generation, None, self._hotel_data(hotel)))
+            last_reservation_id = self._last_reservation_id
+            last_hotel_id = self._last_hotel_id
+            self._outbox.clear()
+        if self.binary:
+            snapshot = hotel_binary.encode([data for _, _, _, data in hotels],
+                                           self._version + 1, last_reservation_id,
+                                           last_hotel_id)
+        else:
+            header = {"format": STORAGE_FORMAT, "version": self._version + 1,
+                      "last_reservation_id": last_reservation_id,
+                      "last_hotel_id": last_hotel_id}
+            snapshot, spans = _encode_snapshot(header, [(fragment, data)
+                                                        for _, _, fragment, data in hotels])
+        serialized = time.perf_counter()
+        stat = _write_atomic(self.filename, snapshot)
+        if self.metrics is not None:
+            self._record_write("save", serialized - started,
+                               time.perf_counter() - serialized, len(snapshot))
+        if self.binary:
+            with open(self.filename, 'rb') as file:
+                binary_snapshot = hotel_binary.BinarySnapshot(file.fileno())
+            fragments = [binary_snapshot.hotel(index) for index in range(len(hotels))]
+            digest = binary_snapshot.digest
+        else:
+            snapshot_file = SnapshotFile(self.filename)
+            fragments = [SnapshotSlice(snapshot_file, start, end) for start, end in spans]
+            digest = _digest(snapshot)
+        with self._lock:
+            for (hotel, generation, _, _), fragment in zip(hotels, fragments):
+                if hotel.generation == generation:
+                    hotel._fragment = fragment
+        self._version += 1
+        self._snapshot_key = _stat_key(stat)
+        self._snapshot_digest = digest
+        if os.path.exists(self.journal_filename):
+            os.remove(self.journal_filename)
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._saved_version = version
+
+    def _record_write(self, name, serialize, disk, size):
+        """Metodo que registra en metrics el tiempo de serializar, el de
+        escribir a disco y los bytes escritos de un guardado.
+        """
+        self.metrics.observe(f"{name}.serialize", serialize)
+        self.metrics.observe(f"{name}.disk", disk)
+        self.metrics.count(f"{name}.bytes", size)
+
+    @staticmethod
+    def _hotel_data(hotel):
+        """Metodo que da el diccionario de un hotel sin construirlo si es
+        diferido.
+        """
+        if hotel.loaded:
+            return hotel.to_dict()
+        data = hotel._fragment.data()
+        data["hotel_id"] = hotel.hotel_id
+        return data
+
+    def export(self, filename, binary=False):
+        """Metodo que escribe una copia de los datos en otro archivo, en JSON
+        o en el formato binario. El archivo del administrador no cambia.
+        """
+        with self._lock:
+            hotels = [self._hotel_data(hotel) for hotel in self.hotels]
+            last_reservation_id = self._last_reservation_id
+            last_hotel_id = self._last_hotel_id
+        if binary:
+            snapshot = hotel_binary.encode(hotels, self._version, last_reservation_id,
+                                           last_hotel_id)
+        else:
+            snapshot = json.dumps({"format": STORAGE_FORMAT, "version": self._version,
+                                   "last_reservation_id": last_reservation_id,
+                                   "last_hotel_id": last_hotel_id,
+                                   "hotels": hotels}, separators=(",", ":")).encode('utf-8')
+        _write_atomic(filename, snapshot)
+
+    def compact(self):
+        """Metodo que incorpora el journal en un nuevo snapshot.
+        """
+        self.save_hotels()
 
-        with open(self.filename, 'w', encoding='utf-8') as file:
-            json.dump(hotels_data, file, indent=4)
+    def stats(self):
+        """Metodo que da una copia de las mediciones de metrics (vacias si
+        no se instrumento) y de los contadores de query_cache.
+        """
+        snapshot = (self.metrics.stats() if self.metrics is not None
+                    else {"operations": {}, "counters": {}})
+        snapshot["query_cache"] = self.query_cache.stats()
+        return snapshot
+
+    def log_operation(self, record):
+        """Metodo que persiste una operacion ya aplicada en memoria.
+        Dentro de un batch la operacion se difiere hasta el final del bloque.
+        """
+        with self._storage_transaction():
+            with self._lock:
+                self._commit(record)
+            self._flush()
+
+    @contextmanager
+    def _mutation(self):
+        """Metodo que envuelve una operacion que modifica datos.
+        La operacion corre con el candado compartido y se persiste al
+        salir de el.
+        """
+        with self._storage_transaction():
+            with self._gate.shared():
+                yield
+            self._flush()
+
+    def _commit(self, record):
+        """Metodo que registra una operacion; requiere el candado del
+        administrador para que el orden del journal sea el de memoria.
+        """
+        self._mutations += 1
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append(record)
+        elif self.journal:
+            self._outbox.append(record)
+
+    def _flush(self):
+        """Metodo que persiste las operaciones registradas.
+        Sin journal se reescribe el snapshot completo, salvo que otro hilo
+        ya haya escrito uno que las incluya.
+        """
+        if getattr(self._local, "pending", None) is not None:
+            return
+        with self._save_lock:
+            if not self.journal:
+                if self._saved_version < self._mutations:
+                    self._write_snapshot()
+                return
+            with self._lock:
+                records = list(self._outbox)
+                self._outbox.clear()
+            if not records:
+                return
+            started = time.perf_counter()
+            lines = []
+            if self._journal_entries == 0 and self._journal_offset == 0:
+                lines.append(_encode_record({"op": "snapshot",
+                                             "digest": self._snapshot_digest}))
+            lines.extend(_encode_record(record) for record in records)
+            data = "".join(lines).encode('utf-8')
+            serialized = time.perf_counter()
+            with open(self.journal_filename, 'ab') as file:
+                file.write(data)
+                self._journal_offset = file.tell()
+            if self.metrics is not None:
+                self._record_write("journal", serialized - started,
+                                   time.perf_counter() - serialized, len(data))
+            self._journal_entries += len(records)
+            if self._journal_entries >= self.journal_limit:
+                self._write_snapshot()
+
+    @contextmanager
+    def batch(self):
+        """Metodo que agrupa operaciones y las persiste una sola vez.
+        Si ocurre un error dentro del bloque se deshacen los cambios hechos
+        en el. Los bloques anidados se integran al bloque exterior y otros
+        hilos esperan a que el bloque termine para modificar datos.
+        """
+        if getattr(self._local, "pending", None) is not None:
+            yield self
+            return
+        with self._storage_transaction(), self._save_lock:
+            with self._gate.exclusive():
+                self._local.pending = []
+                self._local.undo = []
+                try:
+                    yield self
+                except BaseException:
+                    undo = self._local.undo
+                    self._local.pending = None
+                    self._local.undo = None
+                    with self._lock:
+                        for action in reversed(undo):
+                            action()
+                    raise
+                pending = self._local.pending
+                self._local.pending = None
+                self._local.undo = None
+                if pending and self.journal:
+                    with self._lock:
+                        self._outbox.extend(pending)
+            self._flush()
+
+    @contextmanager
+    def savepoint(self):
+        """Metodo que deshace solo los cambios del bloque si este falla,
+        sin deshacer el resto del batch que lo contiene. Fuera de un batch
+        equivale a un batch.
+        """
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            with self.batch():
+                yield self
+            return
+        undo = self._local.undo
+        pending_mark = len(pending)
+        undo_mark = len(undo)
+        try:
+            yield self
+        except BaseException:
+            with self._lock:
+                for action in reversed(undo[undo_mark:]):
+                    action()
+                del undo[undo_mark:]
+                del pending[pending_mark:]
+            raise
+
+    def _register_undo(self, action):
+        """Metodo que registra como deshacer un cambio dentro de un batch.
+        """
+        undo = getattr(self._local, "undo", None)
+        if undo is not None:
+            undo.append(action)
+
+    def _read_journal(self):
+        """Metodo que aplica los registros del journal desde la ultima
+        posicion leida. Un journal cuyo encabezado no corresponde al
+        snapshot ya fue compactado y se ignora; un registro incompleto al
+        final se deja para la siguiente lectura.
+        """
+        if not os.path.exists(self.journal_filename):
+            return 0
+        entries = 0
+        with open(self.journal_filename, 'rb') as file:
+            file.seek(self._journal_offset)
+            if self._journal_offset == 0:
+                header = file.readline()
+                if not header.endswith(b"\n"):
+                    return 0
+                if json.loads(header).get("digest") != self._snapshot_digest:
+                    return 0
+                self._journal_offset = file.tell()
+            with self._lock:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        # Registro que otro proceso aun no termina de escribir.
+                        break
+                    self._journal_offset += len(line)
+                    if not line.strip():
+                        continue
+                    self._apply_operation(json.loads(line))
+                    entries += 1
+        self._journal_entries += entries
+        return entries
+
+    def _apply_operation(self, record):
+        """Metodo que aplica en memoria una operacion del journal.
+        """
+        operation = record["op"]
+        if operation == "create_hotel":
+            hotel_id = record.get("hotel_id") or self._last_hotel_id + 1
+            self._add_hotel(Hotel(record["name"], record["location"], [], hotel_id=hotel_id))
+        elif operation == "delete_hotel":
+            self._remove_hotel(self._record_hotel(record))
+        elif operation == "create_room":
+            hotel = self._record_hotel(record)
+            self._add_room(hotel, Room(**record["room"]))
+        elif operation == "create_reservation":
+            hotel = self._record_hotel(record)
+            room = hotel._room_by_number(record["room"])
+            reservation = Reservation(record["reservation_id"], hotel,
+                                      room, record["guest_name"],
+                                      record.get("check_in"),
+                                      record.get("check_out"))
+            self._add_reservation(hotel, reservation)
+        else:
+            raise ValueError(f"Operación desconocida: {operation}")
+
+    def _record_hotel(self, record):
+        """Metodo que da el hotel de un registro del journal: por su id o,
+        en journals anteriores a los ids, por su posicion.
+        """
+        if "hotel_id" not in record:
+            return self.hotels[record["hotel"]]
+        hotel = self.hotels.get(record["hotel_id"])
+        if hotel is None:
+            raise ValueError(f"Hotel no encontrado en el journal: {record['hotel_id']}")
+        return hotel
+
+    def _rebuild_indexes(self, orders=None):
+        """Metodo que reconstruye los indices secundarios de la cadena.
+        orders da el orden guardado de cada hotel; sin el se numeran en el
+        orden de self.hotels.
+        """
+        self._hotel_order = {}
+        self._next_order = 0
+        self._hotels_by_location = {}
+        self._reservations_by_id = {}
+        self._duplicate_reservations = {}
+        self._room_search = None
+        self._guest_index = None
+        self._last_reservation_id = 0
+        self._unloaded = False
+        self.generation += 1
+        if orders is None:
+            for hotel in self.hotels:
+                self._index_hotel(hotel)
+            return
+        for hotel, order in zip(self.hotels, orders):
+            self._index_hotel(hotel, order)
+        self._next_order = max(orders, default=-1) + 1
+
+    def _index_hotel(self, hotel, order=None):
+        """Metodo que agrega un hotel y sus reservaciones a los indices.
+        El orden conserva la posicion relativa del hotel en self.hotels.
+        """
+        if order is None:
+            order = self._next_order
+            self._next_order += 1
+        self._hotel_order[hotel] = order
+        self.generation += 1
+        bisect.insort(self._hotels_by_location.setdefault(hotel.location, []),
+                      hotel, key=self._hotel_order.__getitem__)
+        if hotel.loaded:
+            for reservation in hotel.reservations:
+                self._index_reservation(hotel, reservation)
+        else:
+            # Sus reservaciones se indexan cuando se construya.
+            self._unloaded = True
+        if self._room_search is not None:
+            self._room_search.add_hotel(hotel)
+
+    def _unindex_hotel(self, hotel):
+        """Metodo que quita un hotel y sus reservaciones de los indices.
+        """
+        if hotel.loaded:
+            for reservation in hotel.reservations:
+                self._unindex_reservation(reservation)
+        _discard(self._hotels_by_location, hotel.location, hotel)
+        self.generation += 1
+        if self._room_search is not None:
+            self._room_search.remove_hotel(hotel)
+        return self._hotel_order.pop(hotel)
+
+    def _load_hotel(self, hotel):
+        """Metodo que construye un hotel diferido e indexa sus reservaciones.
+        Solo toma el candado del administrador, de modo que puede llamarse
+        desde cualquier punto; otros hilos esperan a que termine.
+        """
+        with self._lock:
+            if hotel._loader is None or hotel is self._loading:
+                return
+            self._loading = hotel
+            try:
+                hotel._fill(hotel._fragment.data())
+            finally:
+                self._loading = None
+            hotel._loader = None
+            if hotel in self._hotel_order:
+                for reservation in hotel._reservations:
+                    self._index_reservation(hotel, reservation)
+
+    def _load_all(self):
+        """Metodo que construye todos los hoteles diferidos.
+        Lo usan las consultas que recorren toda la cadena.
+        """
+        if not self._unloaded:
+            return
+        with self._lock:
+            for hotel in list(self.hotels):
+                hotel.load()
+            self._unloaded = False
+            self._reservation_ids_known = True
+
+    def _add_hotel(self, hotel, order=None):
+        """Metodo que agrega un hotel en memoria.
+        Con order (al deshacer una eliminacion) el hotel vuelve a su lugar.
+        """
+        if order is None:
+            self.hotels.append(hotel)
+        else:
+            position = bisect.bisect_left(self.hotels, order,
+                                          key=self._hotel_order.__getitem__)
+            self.hotels.insert(position, hotel)
+        self._last_hotel_id = max(self._last_hotel_id, hotel.hotel_id)
+        self._index_hotel(hotel, order)
+        self._register_undo(lambda: self._remove_hotel(hotel))
+
+    def _remove_hotel(self, hotel):
+        """Metodo que elimina un hotel en memoria en O(1).
+        """
+        self._check_hotel(hotel)
+        self.hotels.pop(hotel.hotel_id)
+        order = self._unindex_hotel(hotel)
+        self._register_undo(lambda: self._add_hotel(hotel, order))
+
+    def _add_room(self, hotel, room):
+        """Metodo que agrega una habitacion en memoria.
+        """
+        hotel.add_room(room)
+        if self._room_search is not None:
+            self._room_search.add_room(hotel, room)
+        self._register_undo(lambda: self._remove_room(hotel, room))
+
+    def _remove_room(self, hotel, room):
+        """Metodo que elimina una habitacion en memoria.
+        """
+        hotel.remove_room(room)
+        if self._room_search is not None:
+            self._room_search.remove_room(room)
+
+    def _add_reservation(self, hotel, reservation):
+        """Metodo que agrega una reservacion en memoria.
+        """
+        hotel.add_reservation(reservation)
+        self._index_reservation(hotel, reservation)
+        self._register_undo(lambda: self._remove_reservation(hotel, reservation))
+
+    def _remove_reservation(self, hotel, reservation):
+        """Metodo que elimina una reservacion en memoria.
+        """
+        hotel.remove_reservation(reservation)
+        self._unindex_reservation(reservation)
+
+    def _index_reservation(self, hotel, reservation):
+        """Metodo que agrega una reservacion al indice por id y, si ya se
+        construyo, al indice por huesped.
+        """
+        reservation_id = reservation.reservation_id
+        current = self._reservations_by_id.setdefault(reservation_id, reservation)
+        if current is not reservation:
+            # Ids repetidos de archivos anteriores: van aparte para que el
+            # indice guarde una sola reservacion por id.
+            duplicates = self._duplicate_reservations.setdefault(reservation_id, [current])
+            if not any(duplicate is reservation for duplicate in duplicates):
+                duplicates.append(reservation)
+        if self._guest_index is not None:
+            self._guest_index.add(reservation)
+        if isinstance(reservation_id, int) and reservation_id > self._last_reservation_id:
+            self._last_reservation_id = reservation_id
+
+    def _unindex_reservation(self, reservation):
+        """Metodo que quita una reservacion de los indices.
+        """
+        if self._guest_index is not None:
+            self._guest_index.remove(reservation)
+        reservation_id = reservation.reservation_id
+        duplicates = self._duplicate_reservations.get(reservation_id)
+        if duplicates is None:
+            if self._reservations_by_id.get(reservation_id) is reservation:
+                del self._reservations_by_id[reservation_id]
+            return
+        _discard(self._duplicate_reservations, reservation_id, reservation)
+        self._reservations_by_id[reservation_id] = duplicates[0]
+        if len(duplicates) == 1:
+            del self._duplicate_reservations[reservation_id]
 
     def create_hotel(self, name, location):
         """Metodo que crea un hotel.
         """
+        _check_type("name", name, str)
+        _check_type("location", location, str)
         hotel = Hotel(name, location, [])
-        self.hotels.append(hotel)
-        self.save_hotels()
+        with self._mutation(), self._lock:
+            hotel.hotel_id = self._last_hotel_id + 1
+            self._add_hotel(hotel)
+            self._commit({"op": "create_hotel", "hotel_id": hotel.hotel_id,
+                          "name": name, "location": location})
         return hotel
 
+    def add_room(self, hotel, room):
+        """Metodo que agrega una habitacion a un hotel y la persiste.
+        """
+        _check_room(room)
+        with self._mutation():
+            hotel = self._current_hotel(hotel)
+            with hotel.lock, self._lock:
+                self._check_hotel(hotel)
+                self._add_room(hotel, room)
+                self._commit({"op": "create_room", "hotel_id": hotel.hotel_id,
+                              "room": room.to_dict()})
+        return room
+
+    def _current_hotel(self, hotel):
+        """Metodo que traduce un hotel a su version cargada actualmente.
+        Una recarga conserva los objetos de los hoteles que siguen en el
+        archivo; si otro proceso elimino y volvio a leer el hotel, se vuelve
+        a buscar por su id.
+        """
+        if not self.shared or hotel in self._hotel_order:
+            return hotel
+        candidate = self.hotels.get(hotel.hotel_id)
+        return candidate if candidate is not None else hotel
+
+    def _current_room(self, hotel, room):
+        """Metodo que traduce una habitacion a la del hotel cargado.
+        """
+        if not self.shared or not isinstance(room, Room) \
+                or hotel.room_by_number(room.number) is room:
+            return room
+        return hotel.room_by_number(room.number) or room
+
+    def _check_hotel(self, hotel):
+        """Metodo que valida que el hotel sea administrado.
+        """
+        if hotel not in self.hotels:
+            raise ValueError("El hotel no pertenece a este administrador.")
+
     def display_all_hotels(self):
         """Metodo que consulta todos los hoteles.
         """
@@ -146,78 +2062,243 @@ class HotelManager:
             print(f"{index}. {hotel.name} ({hotel.location})")
 
     def delete_hotel(self, index):
-        """Metodo que elimina un hotel.
+        """Metodo que elimina un hotel por su posicion (desde 1), como en el
+        menu. Las posiciones cambian al eliminar; delete_hotel_by_id no.
         """
-        if 0 < index <= len(self.hotels):
-            del self.hotels[index - 1]
-            self.save_hotels()
+        with self._mutation(), self._lock:
+            deleted = 0 < index <= len(self.hotels)
+            if deleted:
+                hotel = self.hotels[index - 1]
+                self._remove_hotel(hotel)
+                self._commit({"op": "delete_hotel", "hotel_id": hotel.hotel_id})
+        if deleted:
             print("Hotel eliminado exitosamente.")
         else:
             print("Índice de hotel inválido.")
 
+    def delete_hotel_by_id(self, hotel_id):
+        """Metodo que elimina un hotel por su id en O(1).
+        Regresa el hotel eliminado, o None si no existe.
+        """
+        with self._mutation(), self._lock:
+            hotel = self.hotels.get(hotel_id)
+            if hotel is not None:
+                self._remove_hotel(hotel)
+                self._commit({"op": "delete_hotel", "hotel_id": hotel_id})
+        return hotel
+
+    def get_hotel(self, hotel_id):
+        """Metodo que consulta un hotel por su id; regresa None si no existe.
+        """
+        return self.hotels.get(hotel_id)
+
     def search_hotels_by_location(self, location):
         """Metodo que consulta hoteles por location.
+        El resultado se guarda en cache hasta que se cree o elimine un hotel.
+        """
+        return list(self.query_cache.get(
+            ("hotels_by_location", location), self.generation,
+            lambda: tuple(self._hotels_by_location.get(location, ()))))
+
+    def search_rooms(self, room_type=None, max_price=None, min_price=None,
+                     min_capacity=None, location=None, limit=None):
+        """Metodo que consulta habitaciones en todos los hoteles de la cadena.
+        Regresa tuplas (hotel, habitacion) ordenadas por precio. Con numpy
+        se usa un indice columnar que se construye en la primera consulta y
+        despues se actualiza con cada alta o baja. Las altas y bajas
+        modifican el indice con el candado del administrador, por lo que
+        la consulta lo toma tambien.
+        """
+        self._load_all()
+        if room_search.np is None:
+            with self._lock:
+                hotels = list(self.hotels if location is None
+                              else self._hotels_by_location.get(location, ()))
+            # Fuera del candado: cada hotel se consulta con el suyo.
+            return self._scan_rooms(hotels, room_type, max_price, min_price,
+                                    min_capacity, limit)
+        with self._lock:
+            if self._room_search is None:
+                index = room_search.ChainRoomIndex()
+                for hotel in self.hotels:
+                    index.add_hotel(hotel)
+                self._room_search = index
+            return self._room_search.search(room_type, min_price, max_price,
+                                            min_capacity, location, limit)
+
+    @staticmethod
+    def _scan_rooms(hotels, room_type, max_price, min_price, min_capacity, limit):
+        """Metodo que resuelve search_rooms recorriendo los hoteles dados.
         """
-        found_hotels = [hotel for hotel in self.hotels if hotel.location == location]
-        return found_hotels
+        found = []
+        for hotel in hotels:
+            if room_type is not None:
+                rooms = hotel.search_rooms(room_type, min_price, max_price, min_capacity)
+            else:
+                hotel.load()
+                with hotel.lock:
+                    rooms = [room for room in hotel.rooms
+                             if (min_price is None or room.price >= min_price)
+                             and (max_price is None or room.price <= max_price)
+                             and (min_capacity is None or room.capacity >= min_capacity)]
+            found.extend((hotel, room) for room in rooms)
+        found.sort(key=lambda item: item[1].price)
+        return found if limit is None else found[:limit]
 
     def get_hotel_by_index(self, index):
-        """Metodo que consulta hoteles por index.
+        """Metodo que consulta hoteles por index (posicion desde 1).
+        Se conserva por compatibilidad; get_hotel usa el id.
         """
         return self.hotels[index - 1]
 
-    def create_reservation(self, hotel, room, guest_name):
+    def create_reservation(self, hotel, room, guest_name,
+                           check_in=None, check_out=None, strict=False):
         """Metodo que crea una reserbacion.
+        Sin fechas la reservacion ocupa la habitacion indefinidamente; si ya
+        existe una reservacion que se traslapa se imprime un aviso y se
+        regresa esa reservacion, o con strict=True se lanza ValueError sin
+        imprimir nada.
+        Los ids son unicos en toda la cadena y nunca se reutilizan.
         """
-        existing_reservation = self.find_reservation(hotel, room)
-        if existing_reservation:
-            print("Ya existe una reserva para esta habitación.")
-            return existing_reservation
-        else:
-            reservation_id = len(hotel.reservations) + 1
-            reservation = Reservation(reservation_id, hotel, room, guest_name)
-            hotel.reservations.append(reservation)
-            self.save_hotels()
-            return reservation
+        _check_type("guest_name", guest_name, str)
+        reservation = Reservation(None, hotel, room, guest_name,
+                                  check_in, check_out)
+        with self._mutation():
+            hotel = self._current_hotel(hotel)
+            room = self._current_room(hotel, room)
+            with hotel.lock:
+                existing_reservation = self.find_reservation(
+                    hotel, room, reservation.check_in, reservation.check_out)
+                if existing_reservation:
+                    if strict:
+                        raise ValueError("Ya existe una reserva para esta habitación.")
+                    print("Ya existe una reserva para esta habitación.")
+                    return existing_reservation
+                with self._lock:
+                    self._check_hotel(hotel)
+                    if not self._reservation_ids_known:
+                        # Snapshot sin el ultimo id: hay que ver todas las reservaciones.
+                        self._load_all()
+                    reservation.hotel = hotel
+                    reservation.room = room
+                    reservation.reservation_id = self._last_reservation_id + 1
+                    self._add_reservation(hotel, reservation)
+                    self._commit({"op": "create_reservation",
+                                  "hotel_id": hotel.hotel_id,
+                                  "reservation_id": reservation.reservation_id,
+                                  "room": room.number,
+                                  "guest_name": guest_name,
+                                  "check_in": _format_date(reservation.check_in),
+                                  "check_out": _format_date(reservation.check_out)})
+        return reservation
 
-    def find_reservation(self, hotel, room):
+    def find_reservation(self, hotel, room, check_in=None, check_out=None):
         """Metodo que consulta una reservacion.
+        Con fechas solo cuentan las reservaciones que se traslapan.
         """
-        for reservation in hotel.reservations:
-            if reservation.room == room:
-                return reservation
-        return None
+        return hotel.reservation_for_room(room, check_in, check_out)
+
+    def find_available_rooms(self, hotel, check_in, check_out,
+                             room_type=None, max_price=None):
+        """Metodo que consulta las habitaciones libres de un hotel en un rango.
+        Con room_type las habitaciones salen del indice por precio; cada
+        habitacion se valida contra su calendario en O(log n).
+        """
+        check_in = _parse_date(check_in)
+        check_out = _parse_date(check_out)
+        if room_type is not None:
+            candidates = hotel.search_rooms(room_type, max_price=max_price)
+        elif max_price is not None:
+            candidates = (room for room in hotel.rooms if room.price <= max_price)
+        else:
+            candidates = hotel.rooms
+        return [room for room in candidates
+                if hotel.is_available(room, check_in, check_out)]
 
     def search_reservations_by_hotel(self, hotel):
         """Metodo que consulta reservacion por hotel.
+        El resultado se guarda en cache hasta que el hotel cambie.
         """
-        return [reservations for reservations in hotel.reservations]
+        return list(self.query_cache.get(("reservations_by_hotel", hotel), hotel.generation,
+                                         lambda: tuple(hotel.reservations)))
 
     def search_reservation_by_id(self, reservation_id):
         """Metodo que consulta reservaciones por id.
         """
-        for hotel in self.hotels:
-            for reservation in hotel.reservations:
-                if reservation.reservation_id == reservation_id:
-                    return reservation
-        return None
+        self._load_all()
+        duplicates = self._duplicate_reservations.get(reservation_id)
+        if duplicates is None:
+            return self._reservations_by_id.get(reservation_id)
+        # Ids repetidos entre hoteles: gana el hotel que aparece primero.
+        return min(duplicates, key=lambda reservation: self._hotel_order[reservation.hotel])
+
+    def search_reservations_by_guest(self, guest_name, prefix=False):
+        """Metodo que consulta reservaciones por huesped en toda la cadena,
+        sin distinguir mayusculas ni acentos. Con prefix=True "Garc"
+        encuentra las reservaciones de cualquier García.
+        El indice se construye en la primera consulta y despues se actualiza
+        con cada alta o baja.
+        """
+        self._load_all()
+        with self._lock:
+            if self._guest_index is None:
+                index = GuestIndex()
+                index.extend(reservation for hotel in self.hotels
+                             for reservation in hotel.reservations)
+                self._guest_index = index
+            return self._guest_index.search(guest_name, prefix)
 
 
 class RoomManager:
     """Clase para representar la Administracion de una Habitacion.
     """
-    def __init__(self):
+    INSTRUMENTED = (
+        "create_room", "create_rooms", "search_rooms_by_hotel",
+        "search_rooms_by_hotel_and_type", "search_rooms_by_hotel_type_and_price",
+        "get_room_by_number",
+    )
+
+    def __init__(self, cache_size=1024, metrics=None):
         """Inicializa una nueva instancia de la clase Room Manager.
+        cache_size es el numero de consultas que se guardan en query_cache.
+        Con metrics se instrumentan los metodos de INSTRUMENTED; puede ser
+        la misma instancia de Metrics que la del HotelManager.
         """
         self.rooms = []
+        self.query_cache = QueryCache(cache_size)
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.instrument(self)
+
+    def stats(self):
+        """Metodo que da una copia de las mediciones de metrics (vacias si
+        no se instrumento) y de los contadores de query_cache.
+        """
+        snapshot = (self.metrics.stats() if self.metrics is not None
+                    else {"operations": {}, "counters": {}})
+        snapshot["query_cache"] = self.query_cache.stats()
+        return snapshot
 
     def create_room(self, hotel_manager, hotel, number, room_type, capacity, price):
         """Metodo que crea una habitacion.
         """
         room = Room(number, room_type, capacity, price)
-        hotel.rooms.append(room)
-        hotel_manager.save_hotels()
-        return room
+        return hotel_manager.add_room(hotel, room)
+
+    def create_rooms(self, hotel_manager, hotel, rooms):
+        """Metodo que crea varias habitaciones persistiendo una sola vez.
+        Cada elemento es un diccionario o una tupla
+        (number, room_type, capacity, price).
+        """
+        created = []
+        with hotel_manager.batch():
+            for room_data in rooms:
+                if isinstance(room_data, dict):
+                    room = self.create_room(hotel_manager, hotel, **room_data)
+                else:
+                    room = self.create_room(hotel_manager, hotel, *room_data)
+                created.append(room)
+        return created
 
     def search_rooms_by_hotel(self, hotel):
         """Metodo que consulta una habitacion por hotel.
@@ -226,15 +2307,22 @@ class RoomManager:
 
     def search_rooms_by_hotel_and_type(self, hotel, room_type):
         """Metodo que consulta una habitacion por hotel y tipo.
+        Las habitaciones se regresan ordenadas por precio.
         """
-        found_rooms = [room for room in hotel.rooms if room.room_type == room_type]
-        return found_rooms
+        return hotel.search_rooms(room_type)
 
-    def search_rooms_by_hotel_type_and_price(self, hotel, room_type, max_price):
+    def search_rooms_by_hotel_type_and_price(self, hotel, room_type, max_price,
+                                             min_price=None, min_capacity=None,
+                                             limit=None, offset=0):
         """Metodo que consulta una habitacion por hotel tipo y precio.
+        Las habitaciones se regresan ordenadas por precio; limit y offset
+        paginan sobre ese orden. El resultado se guarda en cache hasta que
+        el hotel cambie.
         """
-        found_rooms = [room for room in hotel.rooms if room.room_type == room_type and room.price <= max_price]
-        return found_rooms
+        key = ("rooms_by_type_and_price", hotel, room_type, max_price, min_price,
+               min_capacity, limit, offset)
+        return list(self.query_cache.get(key, hotel.generation, lambda: tuple(
+            hotel.search_rooms(room_type, min_price, max_price, min_capacity, limit, offset))))
 
     def display_all_rooms(self, hotel):
         """Metodo que consulta todas las habitaciones por hotel.
@@ -247,17 +2335,83 @@ class RoomManager:
     def get_room_by_number(self, hotel, room_number):
         """Metodo que consulta habitaciones por numero.
         """
-        for room in hotel.rooms:
-            if room.number == room_number:
-                return room
-        return None
+        return hotel.room_by_number(room_number)
+
+
+def open_manager(filename, journal=False, shared=False, lazy=False, binary=False,
+                 shards=None, metrics=None):
+    """Funcion que crea el administrador segun las opciones de la linea de
+    comandos; con shards filename es un directorio de shards.
+    """
+    if shards is None:
+        return HotelManager(filename, journal=journal, shared=shared, lazy=lazy,
+                            binary=binary, metrics=metrics)
+    if journal or shared or binary:
+        raise ValueError("--shards no se puede combinar con --journal, --shared ni --binary.")
+    from hotel_shards import ShardedHotelManager
+    return ShardedHotelManager(filename, shards, lazy=lazy, metrics=metrics)
+
+
+def _parse_args(argv):
+    """Funcion que interpreta los argumentos de la linea de comandos.
+    Sin subcomando se abre el menu interactivo.
+    """
+    parser = argparse.ArgumentParser(description="Administración de hoteles.")
+    parser.add_argument("--file", default="hotels.json",
+                        help="archivo de datos (por omisión hotels.json)")
+    parser.add_argument("--journal", action="store_true",
+                        help="guardar cambios en un journal en lugar de reescribir el archivo")
+    parser.add_argument("--shared", action="store_true",
+                        help="permitir que varios procesos escriban el mismo archivo")
+    parser.add_argument("--lazy", action="store_true",
+                        help="construir cada hotel hasta que se consulte")
+    parser.add_argument("--binary", action="store_true",
+                        help="guardar el archivo en el formato binario")
+    parser.add_argument("--shards",
+                        help="repartir los hoteles en archivos dentro del directorio --file: "
+                             "'location' (uno por ubicación) o un número de archivos")
+    parser.add_argument("--metrics", action="store_true",
+                        help="medir llamadas, latencias y guardados (op 'stats' del servidor)")
+    commands = parser.add_subparsers(dest="command")
+    serve = commands.add_parser("serve", help="atender peticiones JSON por TCP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--rate-limit", type=float,
+                       help="peticiones por segundo permitidas por conexión")
+    serve.add_argument("--burst", type=float,
+                       help="peticiones seguidas permitidas antes de limitar")
+    serve.add_argument("--timeout", type=float,
+                       help="tiempo máximo de respuesta de las consultas en segundos")
+    bulk = commands.add_parser("bulk", help="aplicar operaciones desde un archivo JSONL o CSV")
+    bulk.add_argument("operations", help="archivo de operaciones")
+    bulk.add_argument("--format", choices=["jsonl", "csv"],
+                      help="formato del archivo (por omisión según la extensión)")
+    bulk.add_argument("--chunk-size", type=int, default=1000,
+                      help="operaciones que se persisten juntas")
+    return parser.parse_args(argv)
 
 
-def main():
+def main(argv=None):
     """
     Función principal que ejecuta el programa.
     """
-    hotel_manager = HotelManager("hotels.json")
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    if args.command == "serve":
+        import hotel_server
+        hotel_server.serve(args.file, args.host, args.port, args.journal,
+                           args.shared, args.rate_limit, args.burst, args.timeout,
+                           args.lazy, args.binary, args.shards, args.metrics)
+        return
+
+    hotel_manager = open_manager(args.file, args.journal, args.shared, args.lazy,
+                                 args.binary, args.shards,
+                                 Metrics() if args.metrics else None)
+    if args.command == "bulk":
+        import hotel_bulk
+        summary = hotel_bulk.run(hotel_manager, args.operations, args.format, args.chunk_size)
+        if summary["errors"]:
+            sys.exit(1)
+        return
     room_manager = RoomManager()
 
     while True:
@@ -373,7 +2527,10 @@ def main():
                 room = room_manager.get_room_by_number(hotel, room_number)
                 if room:
                     guest_name = input("Ingrese el nombre del huésped: ")
-                    reservation = hotel_manager.create_reservation(hotel, room, guest_name)
+                    check_in = input("Fecha de entrada (AAAA-MM-DD, vacío sin fecha): ") or None
+                    check_out = input("Fecha de salida (AAAA-MM-DD, vacío sin fecha): ") or None
+                    reservation = hotel_manager.create_reservation(
+                        hotel, room, guest_name, check_in, check_out)
                     print(f"Reserva creada con éxito. ID de reserva: {reservation.reservation_id}")
                 else:
                     print("¡Habitación no encontrada!")
@@ -0,0 +1,293 @@
+"""Mediciones de rendimiento de HotelManager y RoomManager.
+    Genera cadenas sinteticas de varios tamaños, mide el tiempo, el numero
+    de operaciones por segundo y la memoria maxima de cada operacion, y las
+    compara contra una linea base guardada.
+    Uso: python hotel_benchmark.py --sizes small,medium --save-baseline base.json
+         python hotel_benchmark.py --sizes small,medium --baseline base.json
+    """
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from hotel import STORAGE_FORMAT, HotelManager, RoomManager
+
+# hoteles, habitaciones por hotel, reservaciones por hotel.
+SIZES = {
+    "small": (10, 20, 10),
+    "medium": (1000, 50, 20),
+    "large": (10000, 100, 100),
+}
+
+FIRST_NAMES = ["José", "María", "Ana", "Luis", "Jorge", "Lucía", "Sofía", "Carlos",
+               "Fernanda", "Andrés", "Valeria", "Raúl"]
+LAST_NAMES = ["García", "Hernández", "López", "Martínez", "González", "Pérez",
+              "Rodríguez", "Sánchez", "Ramírez", "Núñez", "Flores", "Gómez", "Díaz"]
+ROOM_TYPES = ["Suite", "Standard", "Luxury"]
+
+# Diferencias menores a este tiempo o a esta memoria se consideran ruido al comparar.
+MIN_DIFFERENCE = 0.001
+MIN_MEMORY_DIFFERENCE = 64 * 1024
+
+
+def parse_size(value):
+    """Funcion que interpreta un tamaño: un nombre de SIZES o
+    'hotelesxhabitacionesxreservaciones', por ejemplo '100x20x5'. Se
+    necesita al menos un hotel y, si hay reservaciones, al menos una
+    habitacion por hotel.
+    """
+    if value in SIZES:
+        return SIZES[value]
+    try:
+        hotels, rooms, reservations = (int(part) for part in value.split("x"))
+    except ValueError:
+        raise ValueError(f"Tamaño no soportado: {value}") from None
+    check_size(hotels, rooms, reservations)
+    return hotels, rooms, reservations
+
+
+def check_size(hotels, rooms, reservations):
+    """Funcion que valida un tamaño antes de generar la cadena.
+    """
+    if hotels < 1 or rooms < 0 or reservations < 0:
+        raise ValueError(f"Tamaño no soportado: {hotels}x{rooms}x{reservations}; se "
+                         "necesita al menos un hotel y ningún valor negativo")
+    if rooms == 0 and reservations > 0:
+        raise ValueError(f"Tamaño no soportado: {hotels}x{rooms}x{reservations}; las "
+                         "reservaciones necesitan al menos una habitación por hotel")
+
+
+def generate(filename, hotels, rooms, reservations):
+    """Funcion que escribe un archivo sintetico sin pasar por HotelManager.
+    Cada hotel tiene rooms habitaciones y reservations reservaciones; si hay
+    mas reservaciones que habitaciones las fechas se recorren para que no
+    se traslapen.
+    """
+    check_size(hotels, rooms, reservations)
+    reservation_id = 0
+    data = []
+    for index in range(hotels):
+        hotel_reservations = []
+        for position in range(reservations):
+            reservation_id += 1
+            check_in = date(2024, 1, 1) + timedelta(days=5 * (position // rooms))
+            hotel_reservations.append({
+                "reservation_id": reservation_id, "room": position % rooms + 1,
+                "guest_name": (f"{FIRST_NAMES[reservation_id % len(FIRST_NAMES)]} "
+                               f"{LAST_NAMES[reservation_id // 7 % len(LAST_NAMES)]}"),
+                "check_in": check_in.isoformat(),
+                "check_out": (check_in + timedelta(days=4)).isoformat()})
+        data.append({
+            "hotel_id": index + 1, "name": f"Hotel {index}", "location": f"Ciudad {index % 50}",
+            "rooms": [{"number": number,
+                       "room_type": ROOM_TYPES[number % len(ROOM_TYPES)],
+                       "capacity": 1 + number % 4, "price": 500 + (number * 37 + index) % 3000}
+                      for number in range(1, rooms + 1)],
+            "reservations": hotel_reservations})
+    document = {"format": STORAGE_FORMAT, "version": 1,
+                "last_reservation_id": reservation_id, "last_hotel_id": hotels,
+                "hotels": data}
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump(document, file, separators=(",", ":"))
+
+
+def measure(operation, count=1, repeat=5, memory=True):
+    """Funcion que mide una operacion que hace count operaciones.
+    Regresa la mediana de repeat ejecuciones, las operaciones por segundo y,
+    con memory, la memoria maxima reservada durante una ejecucion extra y la
+    que sigue reservada al terminar mientras se conserva su resultado (para
+    load_hotels, el tamaño de la cadena cargada).
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - started)
+    seconds = statistics.median(timings)
+    result = {"seconds": seconds, "operations": count,
+              "throughput": count / seconds if seconds else float("inf")}
+    if memory:
+        tracemalloc.start()
+        try:
+            value = operation()
+            result["retained_memory"], result["peak_memory"] = tracemalloc.get_traced_memory()
+            del value
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_suite(filename, hotels, rooms, reservations, repeat=5, operations=1000, memory=True):
+    """Funcion que genera una cadena en filename y mide cada operacion.
+    Las busquedas usan managers sin cache de consultas, de modo que se mide
+    el indice y no el cache.
+    """
+    generate(filename, hotels, rooms, reservations)
+    results = {}
+    results["load_hotels"] = measure(lambda: HotelManager(filename, cache_size=0),
+                                     repeat=repeat, memory=memory)
+    results["load_hotels_lazy"] = measure(
+        lambda: HotelManager(filename, lazy=True, cache_size=0), repeat=repeat, memory=memory)
+
+    hotel_manager = HotelManager(filename, cache_size=0)
+    room_manager = RoomManager(cache_size=0)
+    chain = hotel_manager.hotels
+    total = hotels * reservations
+
+    def save_full():
+        for hotel in chain:
+            hotel.mark_dirty()
+        hotel_manager.save_hotels()
+
+    def save_incremental():
+        chain[len(chain) // 2].mark_dirty()
+        hotel_manager.save_hotels()
+
+    results["save_full"] = measure(save_full, repeat=repeat, memory=memory)
+    results["save_incremental"] = measure(save_incremental, repeat=repeat, memory=memory)
+
+    # Con mas operaciones que habitaciones cada habitacion recibe varias
+    # reservaciones de una noche en dias seguidos.
+    slots = sum(len(hotel.rooms) for hotel in chain)
+    nights = -(-operations // slots) if slots else 0
+    rounds = iter(range(1, 1 << 30))
+
+    def create_reservations():
+        # Cada ronda usa dias nuevos para que ninguna reservacion choque.
+        first_day = date(2030, 1, 1) + timedelta(days=next(rounds) * nights)
+        with hotel_manager.batch():
+            for position in range(operations):
+                hotel = chain[position % len(chain)]
+                room = hotel.rooms[position // len(chain) % len(hotel.rooms)]
+                check_in = first_day + timedelta(days=position // slots)
+                hotel_manager.create_reservation(hotel, room, "Benchmark", check_in,
+                                                 check_in + timedelta(days=1))
+
+    if slots:
+        results["create_reservation"] = measure(create_reservations, operations,
+                                                repeat, memory)
+
+    def search_by_id():
+        for position in range(operations):
+            hotel_manager.search_reservation_by_id(position * 7919 % max(total, 1) + 1)
+
+    results["search_reservation_by_id"] = measure(search_by_id, operations, repeat, memory)
+
+    def search_by_type_and_price():
+        for position in range(operations):
+            room_manager.search_rooms_by_hotel_type_and_price(
+                chain[position % len(chain)], ROOM_TYPES[position % len(ROOM_TYPES)],
+                500 + position % 3000)
+
+    results["search_rooms_by_hotel_type_and_price"] = measure(
+        search_by_type_and_price, operations, repeat, memory)
+
+    def search_chain():
+        for position in range(operations // 100 or 1):
+            hotel_manager.search_rooms(ROOM_TYPES[position % len(ROOM_TYPES)],
+                                       max_price=600 + position % 3000, limit=20)
+
+    # La primera consulta construye el indice; se mide aparte.
+    results["search_rooms_index_build"] = measure(
+        lambda: hotel_manager.search_rooms(limit=1), repeat=1, memory=False)
+    results["search_rooms"] = measure(search_chain, operations // 100 or 1, repeat, memory)
+
+    def search_by_guest():
+        for position in range(operations):
+            hotel_manager.search_reservations_by_guest(
+                LAST_NAMES[position % len(LAST_NAMES)][:4], prefix=True)
+
+    # Igual que en search_rooms, el indice de huespedes se mide aparte.
+    results["guest_index_build"] = measure(
+        lambda: hotel_manager.search_reservations_by_guest(""), repeat=1, memory=False)
+    results["search_reservations_by_guest"] = measure(search_by_guest, operations,
+                                                      repeat, memory)
+    return results
+
+
+def compare(results, baseline, tolerance=0.5):
+    """Funcion que compara resultados contra una linea base.
+    Regresa una descripcion por cada operacion que tardo o uso memoria mas
+    de tolerance (0.5 = 50%) sobre la linea base; las operaciones que no
+    estan en la linea base se ignoran.
+    """
+    regressions = []
+    for size, operations in results.items():
+        for name, result in operations.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            limit = base["seconds"] * (1 + tolerance)
+            if result["seconds"] > limit and result["seconds"] - base["seconds"] > MIN_DIFFERENCE:
+                regressions.append(f"{size} {name}: {result['seconds'] * 1000:.2f} ms "
+                                   f"contra {base['seconds'] * 1000:.2f} ms")
+            for memory in ("peak_memory", "retained_memory"):
+                if memory in result and memory in base \
+                        and result[memory] > base[memory] * (1 + tolerance) \
+                        and result[memory] - base[memory] > MIN_MEMORY_DIFFERENCE:
+                    regressions.append(f"{size} {name}: {result[memory] / 1e6:.1f} MB "
+                                       f"contra {base[memory] / 1e6:.1f} MB")
+    return regressions
+
+
+def report(results):
+    """Funcion que imprime una tabla con los resultados de cada tamaño.
+    """
+    for size, operations in results.items():
+        print(f"\n{size}")
+        for name, result in operations.items():
+            memory = (f"{result['peak_memory'] / 1e6:9.1f} MB "
+                      f"{result['retained_memory'] / 1e6:9.1f} MB retenidos"
+                      if "peak_memory" in result else "")
+            print(f"  {name:38} {result['seconds'] * 1000:10.2f} ms "
+                  f"{result['throughput']:12.0f} ops/s {memory}")
+
+
+def main(argv=None):
+    """Funcion principal que ejecuta las mediciones.
+    Termina con codigo 1 si alguna operacion empeoro contra --baseline.
+    """
+    parser = argparse.ArgumentParser(description="Mediciones de HotelManager.")
+    parser.add_argument("--sizes", default="small,medium",
+                        help="tamaños separados por comas: "
+                             f"{', '.join(SIZES)} o hotelesxhabitacionesxreservaciones")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--operations", type=int, default=1000,
+                        help="operaciones por medicion de reservaciones y busquedas")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="no medir la memoria maxima (tracemalloc es lento)")
+    parser.add_argument("--baseline", help="archivo JSON con la linea base a comparar")
+    parser.add_argument("--save-baseline", help="guardar los resultados como linea base")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="empeoramiento permitido contra la linea base (0.5 = 50%%)")
+    args = parser.parse_args(argv)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes.split(","):
+            hotels, rooms, reservations = parse_size(size)
+            results[size] = run_suite(os.path.join(directory, f"{size}.json"), hotels, rooms,
+                                      reservations, args.repeat, args.operations,
+                                      not args.no_memory)
+    report(results)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("\nREGRESIONES:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("\nSin regresiones contra la linea base.")
+    return results
+
+
+if __name__ == '__main__':
+    main()
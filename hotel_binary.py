@@ -0,0 +1,276 @@
+"""Formato binario de snapshots de hoteles.
+    El archivo tiene un encabezado, una tabla de hoteles, una de habitaciones
+    y una de reservaciones con registros de ancho fijo, y al final una tabla
+    de textos; los registros guardan el indice del texto en lugar del texto.
+    Se abre con mmap, de modo que abrirlo solo lee el encabezado y varios
+    procesos comparten las mismas paginas.
+    Uso: python hotel_binary.py hotels.json hotels.bin (o al reves)
+    """
+import argparse
+import hashlib
+import mmap
+import struct
+from datetime import date
+
+MAGIC = b"HTLB"
+BINARY_FORMAT = 2
+
+# magic, formato, ultimo id de hotel (reservado en el formato 1), huella del
+# contenido, version del snapshot, ultimo id de reservacion, cantidades y
+# posiciones de cada tabla.
+HEADER = struct.Struct("<4sII20sQQIIIIQQQQQ")
+# nombre, ubicacion, primera habitacion, habitaciones, primera reservacion,
+# reservaciones, id del hotel. El formato 1 no tenia el id.
+HOTEL = struct.Struct("<IIIIIIQ")
+HOTEL_V1 = struct.Struct("<IIIIII")
+# numero es texto, precio es entero, tipo, numero, capacidad, precio.
+ROOM = struct.Struct("<BBxxIqqd")
+# tipo de la habitacion (entero, texto, ninguna), huesped, id, habitacion,
+# entrada y salida como ordinales (0 sin fecha).
+RESERVATION = struct.Struct("<BxxxIqqii")
+OFFSET = struct.Struct("<Q")
+
+NONE = 0xFFFFFFFF
+INTEGER, TEXT, MISSING = 0, 1, 2
+
+
+def is_binary(filename):
+    """Funcion que indica si un archivo es un snapshot binario.
+    """
+    try:
+        with open(filename, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def _ordinal(value):
+    """Funcion que convierte una fecha ISO (o None) en ordinal.
+    """
+    return date.fromisoformat(value).toordinal() if value is not None else 0
+
+
+def _iso(ordinal):
+    """Funcion que convierte un ordinal (0 sin fecha) en fecha ISO.
+    """
+    return date.fromordinal(ordinal).isoformat() if ordinal else None
+
+
+class StringTable:
+    """Clase para representar los textos de un snapshot binario.
+    Cada texto se guarda una vez aunque se repita.
+    """
+    def __init__(self):
+        """Inicializa una nueva instancia de la clase StringTable.
+        """
+        self.indexes = {}
+        self.offsets = [0]
+        self.blob = bytearray()
+
+    def add(self, value):
+        """Metodo que da el indice de un texto agregandolo si hace falta.
+        """
+        if value is None:
+            return NONE
+        index = self.indexes.get(value)
+        if index is None:
+            index = self.indexes[value] = len(self.offsets) - 1
+            self.blob += value.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return index
+
+
+def _key(value, strings):
+    """Funcion que codifica un numero de habitacion entero o de texto.
+    """
+    if value is None:
+        return MISSING, 0
+    if isinstance(value, int) and not isinstance(value, bool):
+        return INTEGER, value
+    if isinstance(value, str):
+        return TEXT, strings.add(value)
+    raise ValueError(f"Valor no soportado en el formato binario: {value!r}")
+
+
+def encode(hotels, version=0, last_reservation_id=0, last_hotel_id=0):
+    """Funcion que codifica hoteles en el formato de to_dict().
+    Regresa los bytes del snapshot.
+    """
+    strings = StringTable()
+    hotel_table = bytearray()
+    room_table = bytearray()
+    reservation_table = bytearray()
+    room_count = reservation_count = 0
+    for hotel in hotels:
+        hotel_table += HOTEL.pack(strings.add(hotel["name"]), strings.add(hotel["location"]),
+                                  room_count, len(hotel["rooms"]),
+                                  reservation_count, len(hotel["reservations"]),
+                                  hotel["hotel_id"])
+        for room in hotel["rooms"]:
+            number_kind, number = _key(room["number"], strings)
+            if number_kind == MISSING:
+                raise ValueError("Habitación sin número.")
+            price = room["price"]
+            room_table += ROOM.pack(number_kind, isinstance(price, int),
+                                    strings.add(room["room_type"]), number,
+                                    room["capacity"], price)
+            room_count += 1
+        for reservation in hotel["reservations"]:
+            if not isinstance(reservation["reservation_id"], int):
+                raise ValueError("El formato binario requiere ids de reservación enteros.")
+            room_kind, room = _key(reservation["room"], strings)
+            reservation_table += RESERVATION.pack(
+                room_kind, strings.add(reservation["guest_name"]),
+                reservation["reservation_id"], room,
+                _ordinal(reservation.get("check_in")),
+                _ordinal(reservation.get("check_out")))
+            reservation_count += 1
+    offsets = b"".join(OFFSET.pack(offset) for offset in strings.offsets)
+    body = [bytes(hotel_table), bytes(room_table), bytes(reservation_table),
+            offsets, bytes(strings.blob)]
+    positions = []
+    position = HEADER.size
+    for section in body:
+        positions.append(position)
+        position += len(section)
+    digest = hashlib.sha1()
+    for section in body:
+        digest.update(section)
+    header = HEADER.pack(MAGIC, BINARY_FORMAT, last_hotel_id, digest.digest(), version,
+                         last_reservation_id, len(hotels), room_count,
+                         reservation_count, len(strings.offsets) - 1, *positions)
+    return header + b"".join(body)
+
+
+class BinarySnapshot:
+    """Clase para representar un snapshot binario abierto con mmap.
+    Solo lee el encabezado al abrirse; cada hotel se decodifica al pedirlo.
+    """
+    def __init__(self, fileno):
+        """Inicializa una nueva instancia de la clase BinarySnapshot.
+        Recibe el descriptor de un archivo abierto; el mapa conserva su
+        propia copia, de modo que el archivo se puede cerrar despues.
+        """
+        self.map = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        (magic, binary_format, self.last_hotel_id, digest, self.version,
+         self.last_reservation_id,
+         self.hotel_count, self.room_count, self.reservation_count, self.string_count,
+         self._hotels, self._rooms, self._reservations, self._offsets,
+         self._blob) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or binary_format not in (1, BINARY_FORMAT):
+            raise ValueError(f"Formato binario no soportado: {binary_format}")
+        # Los hoteles del formato 1 no tienen id; los asigna HotelManager.
+        self._hotel_struct = HOTEL if binary_format == BINARY_FORMAT else HOTEL_V1
+        if binary_format == 1:
+            self.last_hotel_id = 0
+        self.digest = digest.hex()
+        self._shared_strings = {}
+
+    def string(self, index):
+        """Metodo que consulta un texto por su indice.
+        """
+        if index == NONE:
+            return None
+        start, end = struct.unpack_from("<QQ", self.map, self._offsets + index * OFFSET.size)
+        return self.map[self._blob + start:self._blob + end].decode('utf-8')
+
+    def _shared(self, index):
+        """Metodo que consulta un texto que se repite mucho, como el tipo de
+        habitacion, guardando el resultado.
+        """
+        value = self._shared_strings.get(index)
+        if value is None:
+            value = self._shared_strings[index] = self.string(index)
+        return value
+
+    def _key(self, kind, value):
+        """Metodo que decodifica un numero de habitacion.
+        """
+        if kind == INTEGER:
+            return value
+        if kind == TEXT:
+            return self.string(value)
+        return None
+
+    def hotels(self):
+        """Metodo que genera (nombre, ubicacion, id) de cada hotel; el id es
+        None en el formato 1.
+        """
+        end = self._hotels + self.hotel_count * self._hotel_struct.size
+        for values in self._hotel_struct.iter_unpack(self.map[self._hotels:end]):
+            yield (self.string(values[0]), self.string(values[1]),
+                   values[6] if len(values) > 6 else None)
+
+    def hotel(self, index):
+        """Metodo que da el acceso diferido a un hotel.
+        """
+        return BinaryHotel(self, index)
+
+    def hotel_data(self, index):
+        """Metodo que decodifica un hotel al formato de to_dict().
+        """
+        (name, location, first_room, rooms, first_reservation, reservations,
+         *hotel_id) = self._hotel_struct.unpack_from(
+             self.map, self._hotels + index * self._hotel_struct.size)
+        start = self._rooms + first_room * ROOM.size
+        room_list = [{"number": number if number_kind == INTEGER else self._key(number_kind, number),
+                      "room_type": self._shared(room_type),
+                      "capacity": capacity,
+                      "price": int(price) if price_is_int else price}
+                     for number_kind, price_is_int, room_type, number, capacity, price
+                     in ROOM.iter_unpack(self.map[start:start + rooms * ROOM.size])]
+        start = self._reservations + first_reservation * RESERVATION.size
+        reservation_list = [{"reservation_id": reservation_id,
+                             "room": room if room_kind == INTEGER else self._key(room_kind, room),
+                             "guest_name": self.string(guest_name),
+                             "check_in": _iso(check_in),
+                             "check_out": _iso(check_out)}
+                            for room_kind, guest_name, reservation_id, room, check_in, check_out
+                            in RESERVATION.iter_unpack(
+                                self.map[start:start + reservations * RESERVATION.size])]
+        return {"hotel_id": hotel_id[0] if hotel_id else None,
+                "name": self.string(name), "location": self.string(location),
+                "rooms": room_list, "reservations": reservation_list}
+
+
+class BinaryHotel:
+    """Clase para representar un hotel guardado en un snapshot binario.
+    """
+    __slots__ = ("snapshot", "index")
+
+    def __init__(self, snapshot, index):
+        """Inicializa una nueva instancia de la clase BinaryHotel.
+        """
+        self.snapshot = snapshot
+        self.index = index
+
+    def data(self):
+        """Metodo que decodifica el hotel.
+        """
+        return self.snapshot.hotel_data(self.index)
+
+
+def convert(source, target):
+    """Funcion que convierte un snapshot JSON a binario o uno binario a JSON,
+    segun el formato de source. Un journal pendiente de source se incluye;
+    source no se modifica aunque sea de un formato anterior.
+    """
+    from hotel import HotelManager
+    to_binary = not is_binary(source)
+    HotelManager(source, lazy=True, upgrade=False).export(target, binary=to_binary)
+    return to_binary
+
+
+def main(argv=None):
+    """Funcion principal del convertidor.
+    """
+    parser = argparse.ArgumentParser(description="Convierte snapshots JSON y binarios.")
+    parser.add_argument("source", help="archivo de origen")
+    parser.add_argument("target", help="archivo de destino")
+    args = parser.parse_args(argv)
+    to_binary = convert(args.source, args.target)
+    print(f"{args.source} -> {args.target} ({'binario' if to_binary else 'JSON'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Carga masiva de operaciones desde archivos JSONL o CSV.
+    Cada linea es una operacion: create_hotel, create_room,
+    create_reservation o delete_hotel. Los hoteles se indican por nombre.
+    Las operaciones se aplican en bloques y cada bloque se persiste una
+    sola vez; el archivo se lee linea por linea, sin cargarlo completo.
+    """
+import csv
+import json
+import time
+
+from hotel import RoomManager
+
+
+def _number(value):
+    """Funcion que convierte numeros de habitacion escritos como texto.
+    """
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
+
+
+def read_operations(file, file_format):
+    """Funcion que genera (numero de linea, operacion) de un archivo.
+    Las lineas que no se pueden interpretar generan la excepcion en lugar
+    de la operacion, para reportarla sin detener la carga.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            operation = {key: value for key, value in row.items()
+                         if key is not None and value not in (None, "")}
+            try:
+                if "capacity" in operation:
+                    operation["capacity"] = int(operation["capacity"])
+                if "price" in operation:
+                    operation["price"] = float(operation["price"])
+            except ValueError as error:
+                yield reader.line_num, error
+                continue
+            for key in ("number", "room"):
+                if key in operation:
+                    operation[key] = _number(operation[key])
+            yield reader.line_num, operation
+        return
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as error:
+            yield line_number, error
+
+
+class BulkLoader:
+    """Clase para representar una carga masiva sobre un HotelManager.
+    """
+    def __init__(self, hotel_manager, chunk_size=1000, max_errors=100):
+        """Inicializa una nueva instancia de la clase BulkLoader.
+        Se guardan como maximo max_errors errores; el resto solo se cuenta.
+        """
+        self.hotel_manager = hotel_manager
+        self.room_manager = RoomManager()
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.applied = 0
+        self.error_count = 0
+        self.errors = []
+        self._hotels_by_name = {}
+        for hotel in hotel_manager.hotels:
+            self._hotels_by_name.setdefault(hotel.name, hotel)
+
+    def load(self, filename, file_format=None):
+        """Metodo que aplica todas las operaciones de un archivo.
+        Regresa un resumen con operaciones por segundo y errores por linea.
+        """
+        if file_format is None:
+            file_format = "csv" if filename.lower().endswith(".csv") else "jsonl"
+        started = time.perf_counter()
+        lines = 0
+        with open(filename, 'r', encoding='utf-8', newline='') as file:
+            chunk = []
+            for line_number, operation in read_operations(file, file_format):
+                lines += 1
+                chunk.append((line_number, operation))
+                if len(chunk) >= self.chunk_size:
+                    self.apply_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self.apply_chunk(chunk)
+        seconds = time.perf_counter() - started
+        return {
+            "lines": lines,
+            "applied": self.applied,
+            "errors": self.error_count,
+            "error_lines": list(self.errors),
+            "seconds": seconds,
+            "ops_per_second": self.applied / seconds if seconds else 0.0,
+        }
+
+    def apply_chunk(self, chunk):
+        """Metodo que aplica un bloque de operaciones en un solo batch.
+        Una operacion invalida se reporta y, por correr en su propio
+        savepoint, sus cambios parciales se deshacen sin afectar a las demas.
+        """
+        with self.hotel_manager.batch():
+            for line_number, operation in chunk:
+                try:
+                    if isinstance(operation, Exception):
+                        raise operation
+                    with self.hotel_manager.savepoint():
+                        self.apply(operation)
+                    self.applied += 1
+                except (KeyError, TypeError, ValueError) as error:
+                    self._error(line_number, error)
+
+    def _error(self, line_number, error):
+        """Metodo que registra el error de una linea.
+        """
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            message = str(error) if not isinstance(error, KeyError) \
+                else f"Falta el campo {error}"
+            self.errors.append((line_number, message))
+
+    def _hotel(self, name):
+        """Metodo que obtiene un hotel por nombre.
+        """
+        hotel = self._hotels_by_name.get(name)
+        if hotel is None:
+            raise ValueError(f"Hotel no encontrado: {name}")
+        return hotel
+
+    def apply(self, operation):
+        """Metodo que aplica una operacion.
+        """
+        kind = operation["op"]
+        if kind == "create_hotel":
+            hotel = self.hotel_manager.create_hotel(operation["name"], operation["location"])
+            self._hotels_by_name.setdefault(hotel.name, hotel)
+        elif kind == "create_room":
+            hotel = self._hotel(operation["hotel"])
+            if self.room_manager.get_room_by_number(hotel, operation["number"]) is not None:
+                raise ValueError(f"La habitación {operation['number']} ya existe.")
+            self.room_manager.create_room(self.hotel_manager, hotel, operation["number"],
+                                          operation["room_type"], operation["capacity"],
+                                          operation["price"])
+        elif kind == "create_reservation":
+            hotel = self._hotel(operation["hotel"])
+            room = self.room_manager.get_room_by_number(hotel, operation["room"])
+            if room is None:
+                raise ValueError(f"Habitación no encontrada: {operation['room']}")
+            self.hotel_manager.create_reservation(hotel, room, operation["guest_name"],
+                                                  operation.get("check_in"),
+                                                  operation.get("check_out"), strict=True)
+        elif kind == "delete_hotel":
+            hotel = self._hotel(operation["hotel"])
+            self.hotel_manager.delete_hotel_by_id(hotel.hotel_id)
+            del self._hotels_by_name[hotel.name]
+            for other in self.hotel_manager.hotels:
+                if other.name == hotel.name:
+                    self._hotels_by_name[hotel.name] = other
+                    break
+        else:
+            raise ValueError(f"Operación desconocida: {kind}")
+
+
+def run(hotel_manager, filename, file_format=None, chunk_size=1000):
+    """Funcion que ejecuta una carga e imprime el resumen.
+    """
+    summary = BulkLoader(hotel_manager, chunk_size).load(filename, file_format)
+    print(f"Líneas: {summary['lines']}, aplicadas: {summary['applied']}, "
+          f"errores: {summary['errors']}")
+    print(f"Tiempo: {summary['seconds']:.3f} s ({summary['ops_per_second']:.0f} ops/s)")
+    for line_number, message in summary["error_lines"]:
+        print(f"Línea {line_number}: {message}")
+    if summary["errors"] > len(summary["error_lines"]):
+        print(f"... y {summary['errors'] - len(summary['error_lines'])} errores más")
+    return summary
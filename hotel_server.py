@@ -0,0 +1,383 @@
+"""Servidor asyncio que expone HotelManager y RoomManager por TCP.
+    Cada peticion es una linea JSON {"id": ..., "op": ..., "args": {...}} y
+    cada respuesta es una linea JSON {"id": ..., "ok": ..., "result"|"error"}.
+    Los hoteles se indican con su id ("hotel_id") o, por compatibilidad, con
+    su posicion ("hotel": 1, 2, ...) como en el menu; las habitaciones con su
+    numero.
+    """
+import asyncio
+import json
+import time
+
+from hotel import Hotel, Metrics, Reservation, Room, RoomManager, open_manager
+
+
+def _to_json(value):
+    """Funcion que convierte resultados del administrador a JSON.
+    """
+    if isinstance(value, Hotel):
+        return {"hotel_id": value.hotel_id, "name": value.name, "location": value.location}
+    if isinstance(value, Room):
+        return value.to_dict()
+    if isinstance(value, Reservation):
+        data = value.to_dict()
+        data["hotel"] = value.hotel.name
+        return data
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return value
+
+
+class RateLimiter:
+    """Clase para representar un limite de peticiones por segundo.
+    Cubeta de fichas: se recargan rate fichas por segundo hasta burst.
+    """
+    def __init__(self, rate, burst=None):
+        """Inicializa una nueva instancia de la clase RateLimiter.
+        Sin burst se permite una rafaga de rate peticiones, pero al menos de
+        una, para que un rate menor a 1 no rechace todo.
+        """
+        if burst is None:
+            burst = max(1.0, rate)
+        elif burst < 1:
+            raise ValueError("burst debe ser al menos 1.")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def allow(self):
+        """Consume una ficha si hay disponible.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class HotelServer:
+    """Clase para representar el servidor de hoteles.
+    Las consultas se atienden en cuanto llegan, en un hilo aparte para no
+    bloquear el ciclo de eventos; las escrituras que llegan en la misma
+    vuelta del ciclo de eventos se aplican juntas en un batch, de modo que
+    se persisten en un solo paso y fuera del ciclo de eventos.
+    """
+    READ_OPERATIONS = {
+        "list_hotels", "search_hotels_by_location", "search_rooms_by_hotel",
+        "search_rooms_by_hotel_and_type", "search_rooms_by_hotel_type_and_price",
+        "get_room_by_number", "search_reservations_by_hotel",
+        "search_reservation_by_id", "search_reservations_by_guest",
+        "find_available_rooms", "search_rooms", "stats",
+    }
+    WRITE_OPERATIONS = {
+        "create_hotel", "delete_hotel", "create_room", "create_reservation",
+    }
+
+    def __init__(self, hotel_manager, host="127.0.0.1", port=0,
+                 rate_limit=None, burst=None, request_timeout=None):
+        """Inicializa una nueva instancia de la clase HotelServer.
+        rate_limit es el numero de peticiones por segundo permitidas por
+        conexion y request_timeout el tiempo maximo de respuesta de una
+        consulta en segundos. Las escrituras no tienen tiempo maximo: una
+        escritura vencida se aplicaria de todos modos y el reintento del
+        cliente la duplicaria.
+        """
+        if rate_limit:
+            # Un burst invalido se reporta al crear el servidor y no en cada conexion.
+            RateLimiter(rate_limit, burst)
+        self.hotel_manager = hotel_manager
+        self.room_manager = RoomManager(metrics=hotel_manager.metrics)
+        self.host = host
+        self.port = port
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.request_timeout = request_timeout
+        self.server = None
+        self._writes = []
+        self._flush_scheduled = False
+
+    async def start(self):
+        """Metodo que abre el puerto; con port=0 se elige uno libre.
+        """
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        """Metodo que atiende conexiones hasta que se cierre el servidor.
+        """
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """Metodo que cierra el servidor.
+        """
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        """Metodo que atiende una conexion; cada peticion corre en su tarea.
+        """
+        limiter = RateLimiter(self.rate_limit, self.burst) if self.rate_limit else None
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if limiter is not None and not limiter.allow():
+                    await self._send(writer, write_lock,
+                                     self._error(_request_id(line), "Límite de peticiones excedido."))
+                    continue
+                task = asyncio.ensure_future(self._respond(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer, write_lock):
+        """Metodo que resuelve una peticion y escribe su respuesta.
+        """
+        request_id = _request_id(line)
+        try:
+            request = json.loads(line)
+            result = await self.dispatch(request.get("op"), request.get("args") or {})
+            response = {"id": request_id, "ok": True, "result": _to_json(result)}
+        except asyncio.TimeoutError:
+            response = self._error(request_id, "Tiempo de respuesta excedido.")
+        except Exception as error:
+            response = self._error(request_id, str(error) or type(error).__name__)
+        await self._send(writer, write_lock, response)
+
+    @staticmethod
+    def _error(request_id, message):
+        """Metodo que arma una respuesta de error.
+        """
+        return {"id": request_id, "ok": False, "error": message}
+
+    @staticmethod
+    async def _send(writer, write_lock, response):
+        """Metodo que escribe una respuesta completa en la conexion.
+        """
+        async with write_lock:
+            writer.write(json.dumps(response).encode('utf-8') + b"\n")
+            await writer.drain()
+
+    async def dispatch(self, operation, args):
+        """Metodo que ejecuta una operacion de lectura o escritura.
+        """
+        if operation in self.READ_OPERATIONS:
+            result = asyncio.to_thread(self._call, operation, args)
+            if self.request_timeout is None:
+                return await result
+            return await asyncio.wait_for(result, self.request_timeout)
+        if operation in self.WRITE_OPERATIONS:
+            future = asyncio.get_running_loop().create_future()
+            self._writes.append((operation, args, future))
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                asyncio.get_running_loop().call_soon(self._schedule_flush)
+            return await asyncio.shield(future)
+        raise ValueError(f"Operación desconocida: {operation}")
+
+    def _schedule_flush(self):
+        """Metodo que toma las escrituras acumuladas en esta vuelta.
+        """
+        writes, self._writes = self._writes, []
+        self._flush_scheduled = False
+        asyncio.ensure_future(self._flush(writes))
+
+    async def _flush(self, writes):
+        """Metodo que aplica un grupo de escrituras en un hilo aparte.
+        """
+        try:
+            results = await asyncio.to_thread(self._apply_writes, writes)
+        except Exception as error:
+            results = [error] * len(writes)
+        for (_, _, future), result in zip(writes, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _apply_writes(self, writes):
+        """Metodo que aplica escrituras dentro de un batch.
+        Cada escritura corre en su propio savepoint: si falla se deshacen
+        solo sus cambios y las demas se conservan.
+        """
+        results = []
+        with self.hotel_manager.batch():
+            for operation, args, _ in writes:
+                try:
+                    with self.hotel_manager.savepoint():
+                        results.append(self._call(operation, args))
+                except Exception as error:
+                    results.append(error)
+        return results
+
+    def _call(self, operation, args):
+        """Metodo que ejecuta una operacion; un "hotel_id" en los argumentos
+        se traduce al hotel antes de llamarla.
+        """
+        if "hotel_id" in args:
+            args = dict(args)
+            hotel = self.hotel_manager.get_hotel(args.pop("hotel_id"))
+            if hotel is None:
+                raise ValueError("Hotel no encontrado.")
+            args["hotel"] = hotel
+        return getattr(self, "_" + operation)(**args)
+
+    def _hotel(self, hotel):
+        """Metodo que obtiene un hotel ya traducido por su id o por su
+        posicion.
+        """
+        if isinstance(hotel, Hotel):
+            return hotel
+        if not isinstance(hotel, int) or not 0 < hotel <= len(self.hotel_manager.hotels):
+            raise ValueError("Índice de hotel inválido.")
+        return self.hotel_manager.get_hotel_by_index(hotel)
+
+    def _room(self, hotel, number):
+        """Metodo que obtiene una habitacion por su numero.
+        """
+        room = self.room_manager.get_room_by_number(hotel, number)
+        if room is None:
+            raise ValueError("¡Habitación no encontrada!")
+        return room
+
+    def _list_hotels(self):
+        """Consulta todos los hoteles.
+        """
+        return list(self.hotel_manager.hotels)
+
+    def _search_hotels_by_location(self, location):
+        """Consulta hoteles por ubicacion.
+        """
+        return self.hotel_manager.search_hotels_by_location(location)
+
+    def _search_rooms_by_hotel(self, hotel):
+        """Consulta las habitaciones de un hotel.
+        """
+        return list(self.room_manager.search_rooms_by_hotel(self._hotel(hotel)))
+
+    def _search_rooms_by_hotel_and_type(self, hotel, room_type):
+        """Consulta habitaciones por hotel y tipo.
+        """
+        return self.room_manager.search_rooms_by_hotel_and_type(self._hotel(hotel), room_type)
+
+    def _search_rooms_by_hotel_type_and_price(self, hotel, room_type, max_price, **filters):
+        """Consulta habitaciones por hotel, tipo y precio.
+        """
+        return self.room_manager.search_rooms_by_hotel_type_and_price(
+            self._hotel(hotel), room_type, max_price, **filters)
+
+    def _get_room_by_number(self, hotel, number):
+        """Consulta una habitacion por numero.
+        """
+        return self.room_manager.get_room_by_number(self._hotel(hotel), number)
+
+    def _search_reservations_by_hotel(self, hotel):
+        """Consulta las reservaciones de un hotel.
+        """
+        return self.hotel_manager.search_reservations_by_hotel(self._hotel(hotel))
+
+    def _search_reservation_by_id(self, reservation_id):
+        """Consulta una reservacion por id.
+        """
+        return self.hotel_manager.search_reservation_by_id(reservation_id)
+
+    def _search_reservations_by_guest(self, guest_name, prefix=False):
+        """Consulta reservaciones por huesped en toda la cadena.
+        """
+        return self.hotel_manager.search_reservations_by_guest(guest_name, prefix)
+
+    def _find_available_rooms(self, hotel, check_in, check_out, **filters):
+        """Consulta habitaciones libres en un rango de fechas.
+        """
+        return self.hotel_manager.find_available_rooms(
+            self._hotel(hotel), check_in, check_out, **filters)
+
+    def _search_rooms(self, **filters):
+        """Consulta habitaciones en toda la cadena.
+        """
+        return [{"hotel": hotel.name, "room": room.to_dict()}
+                for hotel, room in self.hotel_manager.search_rooms(**filters)]
+
+    def _stats(self):
+        """Consulta las mediciones del administrador; con --metrics incluyen
+        las de las habitaciones.
+        """
+        return self.hotel_manager.stats()
+
+    def _create_hotel(self, name, location):
+        """Crea un hotel.
+        """
+        return self.hotel_manager.create_hotel(name, location)
+
+    def _delete_hotel(self, hotel):
+        """Elimina un hotel.
+        """
+        if self.hotel_manager.delete_hotel_by_id(self._hotel(hotel).hotel_id) is None:
+            raise ValueError("Hotel no encontrado.")
+        return True
+
+    def _create_room(self, hotel, number, room_type, capacity, price):
+        """Crea una habitacion.
+        """
+        return self.room_manager.create_room(self.hotel_manager, self._hotel(hotel),
+                                             number, room_type, capacity, price)
+
+    def _create_reservation(self, hotel, room, guest_name, check_in=None, check_out=None):
+        """Crea una reservacion. Si la habitacion ya esta ocupada se reporta
+        un error en lugar de regresar la reservacion de otro huesped; corre
+        dentro del batch de escrituras, de modo que nadie escribe entre la
+        consulta y la reservacion.
+        """
+        hotel = self._hotel(hotel)
+        room = self._room(hotel, room)
+        if self.hotel_manager.find_reservation(hotel, room, check_in, check_out):
+            raise ValueError("Ya existe una reserva para esta habitación.")
+        return self.hotel_manager.create_reservation(hotel, room, guest_name,
+                                                     check_in, check_out)
+
+
+def _request_id(line):
+    """Funcion que intenta leer el id de una peticion, aunque sea invalida.
+    """
+    try:
+        return json.loads(line).get("id")
+    except (ValueError, AttributeError):
+        return None
+
+
+def serve(filename, host="127.0.0.1", port=8765, journal=False, shared=False,
+          rate_limit=None, burst=None, request_timeout=None, lazy=False, binary=False,
+          shards=None, metrics=False):
+    """Funcion que levanta el servidor hasta que se interrumpa.
+    Con metrics se instrumentan los administradores.
+    """
+    hotel_manager = open_manager(filename, journal, shared, lazy, binary, shards,
+                                 Metrics() if metrics else None)
+    server = HotelServer(hotel_manager, host, port, rate_limit, burst, request_timeout)
+
+    async def run():
+        await server.start()
+        print(f"Servidor escuchando en {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
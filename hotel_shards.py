@@ -0,0 +1,332 @@
+"""Almacenamiento de la cadena repartido en varios archivos.
+    Un enrutador asigna cada hotel a un shard segun su ubicacion: un archivo
+    por ubicacion o un numero fijo de archivos por hash. Cada shard es un
+    snapshot JSON normal; solo se reescriben los shards que cambiaron y la
+    carga y las busquedas de toda la cadena se reparten entre procesos.
+    """
+import hashlib
+import heapq
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from hotel import (STORAGE_FORMAT, HotelManager, SnapshotFile, SnapshotScanner,
+                   SnapshotSlice, _digest, _encode_snapshot, _stat_key, _write_atomic)
+
+# Contadores que shards.json guarda cuando se borra un shard, para no
+# perderlos con el.
+COUNTERS = ("last_reservation_id", "last_hotel_id")
+
+# Caracteres de la ubicacion que se conservan en el nombre de su shard.
+KEY_PREFIX = 24
+
+
+class LocationRouter:
+    """Clase para representar un shard por ubicacion.
+    La llave "keys" de spec distingue los directorios escritos con las
+    llaves anteriores, que se reparten de nuevo al abrirlos.
+    """
+    def __init__(self):
+        """Inicializa una nueva instancia de la clase LocationRouter.
+        """
+        self.spec = {"router": "location", "keys": 2}
+
+    def key(self, location):
+        """Metodo que da el shard de una ubicacion; la llave sirve como
+        nombre de archivo. Es un prefijo legible en minusculas mas un hash
+        de la ubicacion exacta: "Cancun" y "cancun" no comparten archivo en
+        sistemas que no distinguen mayusculas y el nombre nunca es largo.
+        """
+        prefix = "".join(character if character.isascii() and character.isalnum() else "_"
+                         for character in location[:KEY_PREFIX].lower())
+        digest = hashlib.sha1(location.encode('utf-8')).hexdigest()[:12]
+        return f"{prefix}-{digest}"
+
+
+class HashRouter:
+    """Clase para representar un numero fijo de shards por hash de la
+    ubicacion. Todos los hoteles de una ubicacion quedan en el mismo shard.
+    """
+    def __init__(self, count):
+        """Inicializa una nueva instancia de la clase HashRouter.
+        """
+        if count < 1:
+            raise ValueError("El número de shards debe ser positivo.")
+        self.count = count
+        self.spec = {"router": "hash", "count": count}
+
+    def key(self, location):
+        """Metodo que da el shard de una ubicacion.
+        """
+        return f"{zlib.crc32(location.encode('utf-8')) % self.count:04d}"
+
+
+def make_router(shards):
+    """Funcion que crea el enrutador: "location", un numero de shards o un
+    enrutador ya creado.
+    """
+    if shards == "location":
+        return LocationRouter()
+    if isinstance(shards, int):
+        return HashRouter(shards)
+    if isinstance(shards, str) and shards.isdigit():
+        return HashRouter(int(shards))
+    if hasattr(shards, "key"):
+        return shards
+    raise ValueError(f"Partición no soportada: {shards}")
+
+
+def _scan_shard(path, lazy):
+    """Funcion que lee un shard en un proceso de trabajo.
+    Regresa su encabezado y (inicio, fin, datos) por hotel; con lazy los
+    datos solo traen id, nombre y ubicacion.
+    """
+    with open(path, 'rb') as file:
+        scanner = SnapshotScanner(file)
+        hotels = []
+        for start, end, data in scanner.hotels():
+            if lazy:
+                data = {"hotel_id": data.get("hotel_id"), "name": data["name"],
+                        "location": data["location"]}
+            hotels.append((start, end, data))
+    if scanner.legacy:
+        raise ValueError(f"Shard con formato anterior: {path}")
+    return scanner.meta, hotels
+
+
+_loaded_shards = {}
+
+
+def _search_shard(path, filters):
+    """Funcion que busca habitaciones en un shard dentro de un proceso de
+    trabajo. El shard se conserva cargado mientras el archivo no cambie.
+    Regresa (posicion del hotel, posicion de la habitacion, precio).
+    """
+    stat_key = _stat_key(os.stat(path))
+    loaded = _loaded_shards.get(path)
+    if loaded is None or loaded[0] != stat_key:
+        hotel_manager = HotelManager(path)
+        positions = {room: (hotel_position, room_position)
+                     for hotel_position, hotel in enumerate(hotel_manager.hotels)
+                     for room_position, room in enumerate(hotel.rooms)}
+        loaded = _loaded_shards[path] = (stat_key, hotel_manager, positions)
+    _, hotel_manager, positions = loaded
+    return [positions[room] + (room.price,)
+            for _, room in hotel_manager.search_rooms(**filters)]
+
+
+class ShardedHotelManager(HotelManager):
+    """Clase para representar un HotelManager guardado en varios archivos.
+    directory contiene un archivo 'shard-<llave>.json' por shard y
+    'shards.json' con el enrutador usado. Al abrirlo con otro enrutador los
+    hoteles se reparten de nuevo. No soporta journal ni shared.
+    """
+    def __init__(self, directory, shards="location", workers=None, lazy=False, metrics=None):
+        """Inicializa una nueva instancia de la clase ShardedHotelManager.
+        workers es el numero de procesos para cargar (con lazy) y para las
+        busquedas de toda la cadena; con 1 todo corre en el proceso actual.
+        metrics funciona como en HotelManager.
+        """
+        self.router = make_router(shards)
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.directory = directory
+        self.manifest_filename = os.path.join(directory, "shards.json")
+        self._shard_members = {}
+        self._pools = None
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory, lazy=lazy, metrics=metrics)
+
+    def _shard_path(self, key):
+        """Metodo que da el archivo de un shard.
+        """
+        return os.path.join(self.directory, f"shard-{key}.json")
+
+    def _map(self, function, arguments):
+        """Metodo que aplica una funcion a cada argumento, en varios procesos
+        si hay mas de un shard y mas de un proceso permitido.
+        """
+        arguments = list(arguments)
+        if self.workers <= 1 or len(arguments) <= 1:
+            return [function(*argument) for argument in arguments]
+        with ProcessPoolExecutor(min(self.workers, len(arguments))) as pool:
+            return list(pool.map(function, *zip(*arguments)))
+
+    def _read_snapshot(self):
+        """Metodo que carga todos los shards, en paralelo con lazy, y los une
+        en el orden guardado de los hoteles.
+        """
+        self._shard_members = {}
+        keys = sorted(name[len("shard-"):-len(".json")]
+                      for name in os.listdir(self.directory)
+                      if name.startswith("shard-") and name.endswith(".json"))
+        arguments = [(self._shard_path(key), self.lazy) for key in keys]
+        if self.lazy:
+            # Los procesos solo regresan nombre, ubicacion y posicion de cada
+            # hotel; sin lazy enviar los datos completos cuesta lo mismo que
+            # interpretarlos aqui.
+            results = self._map(_scan_shard, arguments)
+        else:
+            results = [_scan_shard(*argument) for argument in arguments]
+        meta = {"version": 0, "last_reservation_id": 0, "last_hotel_id": 0}
+        ordered = []
+        for key, (shard_meta, hotels) in zip(keys, results):
+            snapshot_file = SnapshotFile(self._shard_path(key))
+            members = []
+            for (start, end, hotel_data), order in zip(hotels, shard_meta["orders"]):
+                hotel = self._snapshot_hotel(hotel_data, SnapshotSlice(snapshot_file, start, end))
+                members.append(hotel)
+                ordered.append((order, hotel))
+            self._shard_members[key] = members
+            for name in meta:
+                meta[name] = max(meta[name], shard_meta.get(name, 0))
+        manifest = self._read_manifest() or {}
+        for name in COUNTERS:
+            meta[name] = max(meta[name], manifest.get(name, 0))
+        ordered.sort(key=lambda item: item[0])
+        self.hotels.extend(hotel for _, hotel in ordered)
+        meta["orders"] = [order for order, _ in ordered]
+        # Con otro enrutador se reparte de nuevo, igual que un archivo anterior.
+        spec = {name: value for name, value in manifest.items() if name not in COUNTERS}
+        repartition = bool(keys) and spec != self.router.spec
+        return repartition, meta, _digest(b"")
+
+    def _read_manifest(self):
+        """Metodo que lee el enrutador con el que se escribieron los shards.
+        """
+        try:
+            with open(self.manifest_filename, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _read_journal(self):
+        """Metodo sin efecto: los shards no usan journal.
+        """
+        return 0
+
+    def _write_snapshot(self):
+        """Metodo que reescribe solo los shards con hoteles que cambiaron,
+        que se agregaron o que se eliminaron, y borra los que quedaron vacios.
+        """
+        with self._lock:
+            version = self._mutations
+            shards = {}
+            for hotel in self.hotels:
+                shards.setdefault(self.router.key(hotel.location), []).append(hotel)
+            changed = {}
+            for key, members in shards.items():
+                saved = self._shard_members.get(key)
+                if saved is not None and len(saved) == len(members) and all(
+                        hotel is other and not hotel.dirty
+                        for hotel, other in zip(members, saved)):
+                    continue
+                changed[key] = [
+                    (hotel, hotel.generation, self._hotel_order[hotel],
+                     hotel._fragment if isinstance(hotel._fragment, SnapshotSlice) else None,
+                     None if isinstance(hotel._fragment, SnapshotSlice)
+                     else self._hotel_data(hotel))
+                    for hotel in members]
+            removed = [key for key in self._shard_members if key not in shards]
+            last_reservation_id = self._last_reservation_id
+            last_hotel_id = self._last_hotel_id
+        written = []
+        serialize = disk = size = 0
+        for key, entries in changed.items():
+            started = time.perf_counter()
+            header = {"format": STORAGE_FORMAT, "version": self._version + 1,
+                      "last_reservation_id": last_reservation_id,
+                      "last_hotel_id": last_hotel_id,
+                      "orders": [order for _, _, order, _, _ in entries]}
+            snapshot, spans = _encode_snapshot(
+                header, [(fragment, data) for _, _, _, fragment, data in entries])
+            serialized = time.perf_counter()
+            _write_atomic(self._shard_path(key), snapshot)
+            serialize += serialized - started
+            disk += time.perf_counter() - serialized
+            size += len(snapshot)
+            snapshot_file = SnapshotFile(self._shard_path(key))
+            written.append((key, entries, [SnapshotSlice(snapshot_file, start, end)
+                                           for start, end in spans]))
+        for key in removed:
+            try:
+                os.remove(self._shard_path(key))
+            except FileNotFoundError:
+                pass
+        manifest = self._read_manifest()
+        spec = {name: value for name, value in (manifest or {}).items() if name not in COUNTERS}
+        if removed or spec != self.router.spec:
+            manifest = dict(self.router.spec, last_reservation_id=last_reservation_id,
+                            last_hotel_id=last_hotel_id)
+            _write_atomic(self.manifest_filename, json.dumps(manifest).encode('utf-8'))
+        if self.metrics is not None:
+            self._record_write("save", serialize, disk, size)
+        with self._lock:
+            for key, entries, fragments in written:
+                for (hotel, generation, _, _, _), fragment in zip(entries, fragments):
+                    if hotel.generation == generation:
+                        hotel._fragment = fragment
+                self._shard_members[key] = [hotel for hotel, _, _, _, _ in entries]
+            for key in removed:
+                del self._shard_members[key]
+        self._version += 1
+        self._saved_version = version
+
+    def _worker_pools(self):
+        """Metodo que crea un proceso por trabajador; cada shard siempre va al
+        mismo proceso, que lo conserva cargado entre busquedas.
+        """
+        if self._pools is None:
+            self._pools = [ProcessPoolExecutor(max_workers=1) for _ in range(self.workers)]
+        return self._pools
+
+    def search_rooms(self, room_type=None, max_price=None, min_price=None,
+                     min_capacity=None, location=None, limit=None):
+        """Metodo que consulta habitaciones en toda la cadena.
+        Cada shard se busca en su proceso y los resultados, ya ordenados por
+        precio, se mezclan. Con cambios sin guardar, con cambios hechos
+        durante la busqueda o con un solo proceso se busca en memoria.
+        """
+        if self.workers <= 1 or getattr(self._local, "pending", None) is not None:
+            return super().search_rooms(room_type, max_price, min_price,
+                                        min_capacity, location, limit)
+        filters = {"room_type": room_type, "max_price": max_price, "min_price": min_price,
+                   "min_capacity": min_capacity, "location": location, "limit": limit}
+        # Los procesos buscan sin candados; solo se copian los miembros de
+        # cada shard para traducir las posiciones del disco.
+        with self._gate.shared(), self._lock:
+            unsaved = self._saved_version < self._mutations
+            version = self._mutations
+            members = dict(self._shard_members)
+        if not unsaved:
+            keys = sorted(members)
+            if location is not None:
+                keys = [key for key in keys if key == self.router.key(location)]
+            pools = self._worker_pools()
+            futures = [pools[zlib.crc32(key.encode('utf-8')) % len(pools)].submit(
+                _search_shard, self._shard_path(key), filters) for key in keys]
+            found = [future.result() for future in futures]
+            with self._lock:
+                # Si algo cambio o se guardo mientras tanto las posiciones ya
+                # no corresponden y se busca en memoria.
+                if self._mutations == version and all(
+                        self._shard_members.get(key) is members[key] for key in keys):
+                    results = [[(price, self._hotel_order[members[key][hotel_position]],
+                                 room_position, members[key][hotel_position])
+                                for hotel_position, room_position, price in shard]
+                               for key, shard in zip(keys, found)]
+                    merged = heapq.merge(*results, key=lambda item: item[:3])
+                    return [(hotel, hotel.rooms[room_position])
+                            for _, _, room_position, hotel in islice(merged, limit)]
+        return super().search_rooms(room_type, max_price, min_price,
+                                    min_capacity, location, limit)
+
+    def close(self):
+        """Metodo que termina los procesos de busqueda.
+        """
+        if self._pools is not None:
+            for pool in self._pools:
+                pool.shutdown()
+            self._pools = None
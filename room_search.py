@@ -0,0 +1,153 @@
+"""Indice columnar de habitaciones para busquedas en toda la cadena.
+    """
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy es opcional
+    np = None
+
+
+class ChainRoomIndex:
+    """Clase para representar todas las habitaciones de la cadena en columnas.
+    Cada fila es una habitacion con el codigo de su hotel, el codigo de su
+    tipo, su capacidad y su precio; los filtros se resuelven con mascaras
+    vectorizadas de NumPy. Las filas eliminadas solo se marcan y se
+    compactan cuando son mayoria.
+    """
+    def __init__(self, capacity=1024):
+        """Inicializa una nueva instancia de la clase ChainRoomIndex.
+        """
+        if np is None:
+            raise ImportError("ChainRoomIndex requiere numpy.")
+        self.size = 0
+        self.dead = 0
+        self.hotel_codes = np.empty(capacity, dtype=np.int32)
+        self.type_codes = np.empty(capacity, dtype=np.int32)
+        self.capacities = np.empty(capacity, dtype=np.int64)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.rooms = []
+        self.hotels = []
+        self.hotel_locations = np.empty(16, dtype=np.int32)
+        self._hotel_code = {}
+        self._type_code = {}
+        self._location_code = {}
+        self._row = {}
+
+    def _grow(self, needed):
+        """Duplica el tamano de las columnas cuando ya no hay espacio.
+        """
+        capacity = len(self.prices)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("hotel_codes", "type_codes", "capacities", "prices", "alive"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _code_for_hotel(self, hotel):
+        """Asigna un codigo entero a un hotel.
+        """
+        code = self._hotel_code.get(hotel)
+        if code is None:
+            code = self._hotel_code[hotel] = len(self.hotels)
+            self.hotels.append(hotel)
+            if code >= len(self.hotel_locations):
+                grown = np.empty(len(self.hotel_locations) * 2, dtype=np.int32)
+                grown[:code] = self.hotel_locations[:code]
+                self.hotel_locations = grown
+            location = self._location_code.setdefault(hotel.location,
+                                                      len(self._location_code))
+            self.hotel_locations[code] = location
+        return code
+
+    def add_hotel(self, hotel):
+        """Agrega todas las habitaciones de un hotel.
+        """
+        self._code_for_hotel(hotel)
+        for room in hotel.rooms:
+            self.add_room(hotel, room)
+
+    def add_room(self, hotel, room):
+        """Agrega una habitacion al final de las columnas.
+        """
+        row = self.size
+        self._grow(row + 1)
+        self.hotel_codes[row] = self._code_for_hotel(hotel)
+        self.type_codes[row] = self._type_code.setdefault(room.room_type,
+                                                          len(self._type_code))
+        self.capacities[row] = room.capacity
+        self.prices[row] = room.price
+        self.alive[row] = True
+        self.rooms.append(room)
+        self._row[room] = row
+        self.size += 1
+
+    def remove_room(self, room):
+        """Marca una habitacion como eliminada.
+        """
+        row = self._row.pop(room, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        self.rooms[row] = None
+        self.dead += 1
+        if self.dead * 2 > self.size:
+            self._compact()
+
+    def remove_hotel(self, hotel):
+        """Marca como eliminadas todas las habitaciones de un hotel.
+        """
+        for room in hotel.rooms:
+            self.remove_room(room)
+
+    def _compact(self):
+        """Reescribe las columnas sin las filas eliminadas.
+        """
+        keep = np.flatnonzero(self.alive[:self.size])
+        for name in ("hotel_codes", "type_codes", "capacities", "prices"):
+            column = getattr(self, name)
+            column[:len(keep)] = column[keep]
+        self.alive[:len(keep)] = True
+        self.alive[len(keep):self.size] = False
+        self.rooms = [self.rooms[row] for row in keep.tolist()]
+        self._row = {room: row for row, room in enumerate(self.rooms)}
+        self.size = len(keep)
+        self.dead = 0
+
+    def search(self, room_type=None, min_price=None, max_price=None,
+               min_capacity=None, location=None, limit=None):
+        """Consulta habitaciones de toda la cadena ordenadas por precio.
+        Regresa una lista de tuplas (hotel, habitacion); con limit solo se
+        ordenan las limit habitaciones mas baratas.
+        """
+        size = self.size
+        mask = self.alive[:size].copy()
+        if room_type is not None:
+            code = self._type_code.get(room_type)
+            if code is None:
+                return []
+            mask &= self.type_codes[:size] == code
+        if location is not None:
+            code = self._location_code.get(location)
+            if code is None:
+                return []
+            mask &= self.hotel_locations[self.hotel_codes[:size]] == code
+        prices = self.prices[:size]
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+        if min_capacity is not None:
+            mask &= self.capacities[:size] >= min_capacity
+        rows = np.flatnonzero(mask)
+        if limit is not None and limit < len(rows):
+            if limit <= 0:
+                return []
+            rows = rows[np.argpartition(prices[rows], limit - 1)[:limit]]
+        rows = rows[np.argsort(prices[rows], kind="stable")]
+        hotel_codes = self.hotel_codes
+        return [(self.hotels[hotel_codes[row]], self.rooms[row])
+                for row in rows.tolist()]
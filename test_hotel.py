@@ -1,5 +1,18 @@
+import cProfile
+import json
+import multiprocessing
+import os
+import pstats
+import tempfile
+import threading
+import tracemalloc
 import unittest
-from hotel import HotelManager, RoomManager
+from datetime import date, timedelta
+from unittest import mock
+import hotel_benchmark
+import room_search
+from hotel import (Hotel, HotelManager, Metrics, QueryCache, Reservation, Room,
+                   RoomManager, SnapshotScanner)
 
 
 class TestHotel(unittest.TestCase):
@@ -118,6 +131,910 @@ class TestHotel(unittest.TestCase):
         room_exist = self.room_manager.get_room_by_number(found_hotels, room_number)
         self.assertIsNotNone(room_exist)
 
+    def test_models_use_slots(self):
+        # Los modelos no deben cargar un __dict__ por instancia
+        room = Room(1, "Suite", 2, 100)
+        hotel = Hotel("Hotel Slots", "Monterrey", [room])
+        reservation = Reservation(1, hotel, room, "Ana")
+        for instance in (room, hotel, reservation):
+            self.assertFalse(hasattr(instance, "__dict__"))
+
+
+
+class TestHotelStorage(unittest.TestCase):
+
+    def setUp(self):
+        # Cada prueba usa su propio directorio temporal
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_loaded_chain_memory(self):
+        # Una cadena cargada ocupa menos que su JSON como diccionarios; cada
+        # habitacion con una sola reservacion no crea calendario propio.
+        filename = os.path.join(self.tmpdir.name, "memoria.json")
+        hotel_benchmark.generate(filename, 50, 40, 40)
+        tracemalloc.start()
+        with open(filename, encoding='utf-8') as file:
+            document = json.load(file)
+        json_memory = tracemalloc.get_traced_memory()[0]
+        del document
+        tracemalloc.stop()
+        tracemalloc.start()
+        hotel_manager = HotelManager(filename)
+        loaded_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.assertLess(loaded_memory, json_memory * 0.9)
+        hotel = hotel_manager.hotels[0]
+        self.assertIs(hotel._schedules[hotel.rooms[0]], hotel.reservations[0])
+
+    def test_journal_replay(self):
+        hotel_manager = HotelManager(self.filename, journal=True)
+        room_manager = RoomManager()
+        hotel = hotel_manager.create_hotel("Hotel Journal", "Cancun")
+        room = room_manager.create_room(hotel_manager, hotel, 1, "Luxury", 2, 3000)
+        hotel_manager.create_reservation(hotel, room, "Ana")
+        # Solo se escribio el journal, no el snapshot
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertTrue(os.path.exists(hotel_manager.journal_filename))
+
+        reloaded = HotelManager(self.filename, journal=True)
+        self.assertEqual(len(reloaded.hotels), 1)
+        reloaded_hotel = reloaded.hotels[0]
+        self.assertEqual(reloaded_hotel.rooms[0].price, 3000)
+        self.assertIs(reloaded_hotel.reservations[0].room, reloaded_hotel.rooms[0])
+
+    def test_journal_compaction(self):
+        hotel_manager = HotelManager(self.filename, journal=True, journal_limit=3)
+        for index in range(4):
+            hotel_manager.create_hotel(f"Hotel {index}", "Merida")
+        # El tercer registro disparo la compactacion
+        self.assertTrue(os.path.exists(self.filename))
+        hotel_manager.delete_hotel(1)
+
+        reloaded = HotelManager(self.filename)
+        self.assertEqual([hotel.name for hotel in reloaded.hotels],
+                         ["Hotel 1", "Hotel 2", "Hotel 3"])
+
+    def test_stale_journal_ignored(self):
+        hotel_manager = HotelManager(self.filename, journal=True)
+        hotel_manager.create_hotel("Hotel A", "Puebla")
+        with open(hotel_manager.journal_filename, encoding='utf-8') as file:
+            journal = file.read()
+        hotel_manager.compact()
+        # Un journal que ya fue compactado no debe aplicarse dos veces
+        with open(hotel_manager.journal_filename, 'w', encoding='utf-8') as file:
+            file.write(journal)
+        reloaded = HotelManager(self.filename, journal=True)
+        self.assertEqual(len(reloaded.hotels), 1)
+
+    def test_batch_persists_once(self):
+        hotel_manager = HotelManager(self.filename)
+        room_manager = RoomManager()
+        hotel = hotel_manager.create_hotel("Hotel Batch", "Oaxaca")
+        with mock.patch.object(hotel_manager, "_write_snapshot",
+                               wraps=hotel_manager._write_snapshot) as save:
+            rooms = room_manager.create_rooms(
+                hotel_manager, hotel,
+                [(number, "Standard", 2, 900) for number in range(1, 501)])
+        self.assertEqual(len(rooms), 500)
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(len(HotelManager(self.filename).hotels[0].rooms), 500)
+
+    def test_batch_rollback(self):
+        hotel_manager = HotelManager(self.filename)
+        room_manager = RoomManager()
+        hotel = hotel_manager.create_hotel("Hotel Base", "Oaxaca")
+        with self.assertRaises(RuntimeError):
+            with hotel_manager.batch():
+                room_manager.create_room(hotel_manager, hotel, 1, "Suite", 4, 5000)
+                hotel_manager.create_hotel("Hotel Nuevo", "Tijuana")
+                hotel_manager.delete_hotel(1)
+                raise RuntimeError("falla a mitad del bloque")
+        # El estado en memoria y en disco es el anterior al bloque
+        self.assertEqual([h.name for h in hotel_manager.hotels], ["Hotel Base"])
+        self.assertEqual(hotel.rooms, [])
+        self.assertEqual(len(HotelManager(self.filename).hotels), 1)
+
+    def test_batch_rejects_foreign_hotel(self):
+        hotel_manager = HotelManager(self.filename)
+        other_manager = HotelManager(os.path.join(self.tmpdir.name, "otro.json"))
+        foreign = other_manager.create_hotel("Hotel Ajeno", "Leon")
+        with self.assertRaises(ValueError):
+            RoomManager().create_rooms(hotel_manager, foreign, [(1, "Suite", 2, 100)])
+        self.assertEqual(foreign.rooms, [])
+
+    def test_legacy_format_upgrade(self):
+        room = {"number": 7, "room_type": "Suite", "capacity": 2, "price": 2500}
+        legacy = [{
+            "name": "Hotel Viejo", "location": "Puebla", "rooms": [room],
+            "reservations": [{
+                "reservation_id": 1,
+                "hotel": {"name": "Hotel Viejo", "location": "Puebla"},
+                "room": room, "guest_name": "Ana"}]}]
+        with open(self.filename, 'w', encoding='utf-8') as file:
+            json.dump(legacy, file, indent=4)
+        legacy_size = os.path.getsize(self.filename)
+
+        hotel_manager = HotelManager(self.filename)
+        hotel = hotel_manager.hotels[0]
+        reservation = hotel.reservations[0]
+        self.assertIs(reservation.hotel, hotel)
+        self.assertIs(reservation.room, hotel.rooms[0])
+        # El archivo se reescribio en el formato normalizado
+        with open(self.filename, encoding='utf-8') as file:
+            document = json.load(file)
+        self.assertEqual(document["format"], 2)
+        self.assertEqual(document["hotels"][0]["reservations"][0]["room"], 7)
+        self.assertLess(os.path.getsize(self.filename), legacy_size)
+        # Guardar de nuevo despues de recargar ya no falla
+        hotel_manager.create_hotel("Hotel Nuevo", "Puebla")
+        reloaded = HotelManager(self.filename)
+        self.assertIs(reloaded.hotels[0].reservations[0].room, reloaded.hotels[0].rooms[0])
+
+    def test_save_serializes_only_dirty_hotels(self):
+        hotel_manager = HotelManager(self.filename)
+        room_manager = RoomManager()
+        with hotel_manager.batch():
+            for index in range(4):
+                hotel = hotel_manager.create_hotel(f"Hotel {index}", "Cancun")
+                room_manager.create_room(hotel_manager, hotel, 1, "Suite", 2, 1000)
+        hotel_manager = HotelManager(self.filename)
+        self.assertFalse(any(hotel.dirty for hotel in hotel_manager.hotels))
+        hotel = hotel_manager.hotels[2]
+        with mock.patch.object(Hotel, "to_dict", autospec=True,
+                               side_effect=Hotel.to_dict) as to_dict:
+            hotel_manager.create_reservation(hotel, hotel.rooms[0], "Ana")
+            hotel_manager.create_reservation(hotel_manager.hotels[0],
+                                             hotel_manager.hotels[0].rooms[0], "Luis")
+        self.assertEqual([call.args[0] for call in to_dict.call_args_list],
+                         [hotel, hotel_manager.hotels[0]])
+        self.assertFalse(hotel.dirty)
+
+        reloaded = HotelManager(self.filename)
+        self.assertEqual([h.to_dict() for h in reloaded.hotels],
+                         [h.to_dict() for h in hotel_manager.hotels])
+        self.assertEqual(reloaded.hotels[2].reservations[0].guest_name, "Ana")
+
+
+class TestHotelIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.hotel_manager = HotelManager(os.path.join(self.tmpdir.name, "hotels.json"))
+        self.room_manager = RoomManager()
+        with self.hotel_manager.batch():
+            for index in range(6):
+                hotel = self.hotel_manager.create_hotel(
+                    f"Hotel {index}", "Cancun" if index % 2 else "Merida")
+                for number in range(1, 4):
+                    room = self.room_manager.create_room(
+                        self.hotel_manager, hotel, number, "Standard", 2, 1000)
+                    self.hotel_manager.create_reservation(hotel, room, f"Huesped {number}")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_search_hotels_by_location_index(self):
+        self.hotel_manager.delete_hotel(2)
+        expected = [h for h in self.hotel_manager.hotels if h.location == "Cancun"]
+        self.assertEqual(self.hotel_manager.search_hotels_by_location("Cancun"), expected)
+        self.assertEqual(self.hotel_manager.search_hotels_by_location("Puebla"), [])
+
+    def test_search_reservation_by_id_index(self):
+        first = self.hotel_manager.hotels[0]
+        second = self.hotel_manager.hotels[1]
+        self.assertIs(self.hotel_manager.search_reservation_by_id(2),
+                      first.reservations[1])
+        self.assertIs(self.hotel_manager.search_reservation_by_id(5),
+                      second.reservations[1])
+        self.hotel_manager.delete_hotel(1)
+        self.assertIsNone(self.hotel_manager.search_reservation_by_id(2))
+        self.assertIsNone(self.hotel_manager.search_reservation_by_id(99))
+
+    def test_search_reservation_by_id_legacy_duplicates(self):
+        # Archivos anteriores repiten ids entre hoteles; gana el primer hotel
+        room = {"number": 1, "room_type": "Suite", "capacity": 2, "price": 100}
+        legacy = [{"name": f"Hotel {index}", "location": "Leon", "rooms": [room],
+                   "reservations": [{"reservation_id": 1, "room": room,
+                                     "guest_name": f"Huesped {index}"}]}
+                  for index in range(3)]
+        filename = os.path.join(self.tmpdir.name, "legacy.json")
+        with open(filename, 'w', encoding='utf-8') as file:
+            json.dump(legacy, file)
+        hotel_manager = HotelManager(filename)
+        self.assertEqual(hotel_manager.search_reservation_by_id(1).guest_name, "Huesped 0")
+        hotel_manager.delete_hotel(1)
+        self.assertEqual(hotel_manager.search_reservation_by_id(1).guest_name, "Huesped 1")
+        # Las reservaciones nuevas no repiten ids existentes
+        hotel = hotel_manager.hotels[0]
+        room = RoomManager().create_room(hotel_manager, hotel, 2, "Suite", 2, 100)
+        reservation = hotel_manager.create_reservation(hotel, room, "Ana")
+        self.assertEqual(reservation.reservation_id, 2)
+
+    def test_repeated_room_numbers(self):
+        first = Room(1, "Suite", 2, 900)
+        second = Room(1, "Standard", 2, 500)
+        hotel = Hotel("Hotel Repetido", "Leon", [first, second])
+        self.assertIs(hotel.room_by_number(1), first)
+        hotel.remove_room(first)
+        self.assertIs(hotel.room_by_number(1), second)
+        hotel.remove_room(second)
+        self.assertIsNone(hotel.room_by_number(1))
+
+    def test_room_and_reservation_lookup_index(self):
+        hotel = self.hotel_manager.get_hotel_by_index(3)
+        room = self.room_manager.get_room_by_number(hotel, 2)
+        self.assertIs(room, hotel.rooms[1])
+        self.assertIs(self.hotel_manager.find_reservation(hotel, room),
+                      hotel.reservations[1])
+        self.assertIsNone(self.room_manager.get_room_by_number(hotel, 9))
+
+    def test_indexes_survive_reload(self):
+        reloaded = HotelManager(self.hotel_manager.filename)
+        self.assertEqual(len(reloaded.search_hotels_by_location("Merida")), 3)
+        hotel = reloaded.get_hotel_by_index(1)
+        self.assertIs(RoomManager().get_room_by_number(hotel, 3), hotel.rooms[2])
+
+    def test_search_rooms_price_order_and_ranges(self):
+        hotel = self.hotel_manager.create_hotel("Hotel Precios", "Leon")
+        self.room_manager.create_rooms(self.hotel_manager, hotel, [
+            (101, "Luxury", 2, 4800), (102, "Luxury", 4, 3000),
+            (103, "Standard", 2, 900), (104, "Luxury", 3, 3000),
+            (105, "Luxury", 2, 6000)])
+        search = self.room_manager.search_rooms_by_hotel_type_and_price
+        numbers = [room.number for room in search(hotel, "Luxury", 5000)]
+        self.assertEqual(numbers, [102, 104, 101])
+        numbers = [room.number for room in search(hotel, "Luxury", 6000, min_price=3500)]
+        self.assertEqual(numbers, [101, 105])
+        numbers = [room.number for room in search(hotel, "Luxury", 6000, min_capacity=3)]
+        self.assertEqual(numbers, [102, 104])
+        numbers = [room.number for room in search(hotel, "Luxury", 6000, limit=2, offset=1)]
+        self.assertEqual(numbers, [104, 101])
+        self.assertEqual(search(hotel, "Suite", 6000), [])
+        self.assertEqual(len(self.room_manager.search_rooms_by_hotel_and_type(hotel, "Luxury")), 4)
+
+
+class TestChainRoomSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.hotel_manager = HotelManager(os.path.join(self.tmpdir.name, "hotels.json"))
+        self.room_manager = RoomManager()
+        with self.hotel_manager.batch():
+            for index in range(4):
+                hotel = self.hotel_manager.create_hotel(
+                    f"Hotel {index}", "Cancun" if index % 2 else "Merida")
+                self.room_manager.create_rooms(self.hotel_manager, hotel, [
+                    (number, "Luxury" if number % 2 else "Standard",
+                     number % 4 + 1, 1000 * number + index)
+                    for number in range(1, 7)])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def search(self, **filters):
+        return [(hotel.name, room.number)
+                for hotel, room in self.hotel_manager.search_rooms(**filters)]
+
+    def assert_search(self, expected, **filters):
+        self.assertEqual(self.search(**filters), expected)
+        # El recorrido sin numpy debe dar el mismo resultado
+        with mock.patch.object(room_search, "np", None):
+            self.assertEqual(self.search(**filters), expected)
+
+    @unittest.skipIf(room_search.np is None, "numpy no esta instalado")
+    def test_search_rooms_filters(self):
+        self.assert_search([("Hotel 0", 1), ("Hotel 1", 1), ("Hotel 2", 1)],
+                           room_type="Luxury", limit=3)
+        self.assert_search([("Hotel 1", 3), ("Hotel 3", 3), ("Hotel 1", 5), ("Hotel 3", 5)],
+                           room_type="Luxury", location="Cancun", min_price=2000)
+        self.assert_search([("Hotel 2", 3), ("Hotel 3", 3)],
+                           min_capacity=4, min_price=3002, max_price=5000)
+        self.assert_search([], room_type="Suite")
+
+    @unittest.skipIf(room_search.np is None, "numpy no esta instalado")
+    def test_search_rooms_incremental(self):
+        self.assertEqual(len(self.search(room_type="Luxury")), 12)
+        hotel = self.hotel_manager.create_hotel("Hotel Nuevo", "Tijuana")
+        self.room_manager.create_room(self.hotel_manager, hotel, 1, "Luxury", 2, 10)
+        self.assertEqual(self.search(room_type="Luxury", limit=1), [("Hotel Nuevo", 1)])
+        self.hotel_manager.delete_hotel(1)
+        self.hotel_manager.delete_hotel(1)
+        self.assert_search([("Hotel Nuevo", 1), ("Hotel 2", 1), ("Hotel 3", 1)],
+                           room_type="Luxury", limit=3)
+
+
+class TestConcurrency(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+        self.hotel_manager = HotelManager(self.filename, journal=True, journal_limit=50)
+        self.room_manager = RoomManager()
+        with self.hotel_manager.batch():
+            for index in range(4):
+                hotel = self.hotel_manager.create_hotel(f"Hotel {index}", "Cancun")
+                self.room_manager.create_rooms(
+                    self.hotel_manager, hotel,
+                    [(number, "Standard", 2, 500) for number in range(1, 11)])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_threads(self, target, count):
+        threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_bookings_do_not_double_book(self):
+        hotel = self.hotel_manager.hotels[0]
+        room = hotel.rooms[0]
+        results = []
+
+        def book(index):
+            results.append(self.hotel_manager.create_reservation(
+                hotel, room, f"Huesped {index}", "2024-05-01", "2024-05-03"))
+
+        self.run_threads(book, 16)
+        self.assertEqual(len(hotel.reservations), 1)
+        self.assertTrue(all(result is hotel.reservations[0] for result in results))
+
+    def test_search_rooms_during_writes(self):
+        hotel = self.hotel_manager.hotels[0]
+        errors = []
+
+        def work(index):
+            try:
+                for number in range(100):
+                    if index % 2:
+                        self.room_manager.create_room(self.hotel_manager, hotel,
+                                                      1000 * index + number, "Standard", 2, 400)
+                    else:
+                        for _, room in self.hotel_manager.search_rooms("Standard"):
+                            self.assertIsNotNone(room)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        self.run_threads(work, 8)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.hotel_manager.search_rooms("Standard")), 440)
+
+    def test_hotel_indexes_during_writes(self):
+        hotel = self.hotel_manager.hotels[1]
+        room = hotel.rooms[0]
+        booked = self.hotel_manager.create_reservation(hotel, room, "Ana",
+                                                       "2024-06-01", "2024-06-02")
+        room_manager = RoomManager(cache_size=0)
+        writing = threading.Event()
+        errors = []
+
+        def write(index):
+            try:
+                # En un batch las escrituras no esperan al disco.
+                with self.hotel_manager.batch():
+                    for number in range(2000):
+                        if index:
+                            day = date(2024, 5, 31) - timedelta(days=number)
+                            self.hotel_manager.create_reservation(hotel, room, "Luis", day,
+                                                                  day + timedelta(days=1))
+                        else:
+                            room_manager.create_room(self.hotel_manager, hotel, 100 + number,
+                                                     "S", 1, 10 if number % 2 else 1000)
+            finally:
+                writing.clear()
+
+        def read(index):
+            try:
+                while writing.is_set():
+                    if index % 2:
+                        found = room_manager.search_rooms_by_hotel_type_and_price(hotel, "S", 10)
+                        self.assertTrue(all(found_room.price == 10 for found_room in found))
+                    else:
+                        self.assertIs(hotel.reservation_for_room(room, "2024-06-01",
+                                                                 "2024-06-02"), booked)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        for index in range(2):
+            writing.set()
+            threads = [threading.Thread(target=write, args=(index,))]
+            threads += [threading.Thread(target=read, args=(reader,)) for reader in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_reservation_ids_are_unique(self):
+        def book(index):
+            hotel = self.hotel_manager.hotels[index % 4]
+            for number in range(1, 11):
+                room = self.room_manager.get_room_by_number(hotel, number)
+                self.hotel_manager.create_reservation(
+                    hotel, room, f"Huesped {index}",
+                    f"2024-06-{index + 1:02d}", f"2024-06-{index + 2:02d}")
+
+        self.run_threads(book, 12)
+        ids = [reservation.reservation_id
+               for hotel in self.hotel_manager.hotels
+               for reservation in hotel.reservations]
+        self.assertEqual(len(ids), 120)
+        self.assertEqual(sorted(ids), list(range(1, 121)))
+        # El journal y los snapshots intermedios reproducen el mismo estado
+        reloaded = HotelManager(self.filename, journal=True)
+        reloaded_ids = [reservation.reservation_id
+                        for hotel in reloaded.hotels
+                        for reservation in hotel.reservations]
+        self.assertEqual(sorted(reloaded_ids), sorted(ids))
+
+    def test_batch_is_isolated_from_other_threads(self):
+        hotel = self.hotel_manager.hotels[1]
+        started = threading.Event()
+
+        def other(index):
+            started.wait()
+            self.hotel_manager.create_hotel("Hotel Paralelo", "Leon")
+
+        thread = threading.Thread(target=other, args=(0,))
+        thread.start()
+        with self.assertRaises(RuntimeError):
+            with self.hotel_manager.batch():
+                self.room_manager.create_room(self.hotel_manager, hotel, 99, "Suite", 2, 900)
+                started.set()
+                raise RuntimeError("se deshace el bloque")
+        thread.join()
+        self.assertIsNone(self.room_manager.get_room_by_number(hotel, 99))
+        reloaded = HotelManager(self.filename, journal=True)
+        self.assertEqual([h.name for h in reloaded.hotels][-1], "Hotel Paralelo")
+        self.assertIsNone(self.room_manager.get_room_by_number(reloaded.hotels[1], 99))
+
+
+def _shared_writer(filename, journal, worker, count):
+    # Cada proceso agrega hoteles y reservaciones al mismo archivo
+    hotel_manager = HotelManager(filename, journal=journal, journal_limit=7, shared=True)
+    room_manager = RoomManager()
+    for index in range(count):
+        hotel = hotel_manager.create_hotel(f"Hotel {worker}-{index}", f"Zona {worker}")
+        room_manager.create_room(hotel_manager, hotel, 1, "Standard", 2, 500)
+        # El hotel se sigue usando aunque otro proceso haya escrito entre medio.
+        hotel_manager.create_reservation(hotel, hotel.rooms[0], f"Huesped {worker}")
+
+
+class TestSharedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_writers(self, journal, workers=4, count=10):
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=_shared_writer,
+                                     args=(self.filename, journal, worker, count))
+                     for worker in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual([process.exitcode for process in processes], [0] * workers)
+
+    def assert_complete(self, hotel_manager, workers=4, count=10):
+        self.assertEqual(len(hotel_manager.hotels), workers * count)
+        ids = [hotel.reservations[0].reservation_id for hotel in hotel_manager.hotels]
+        self.assertEqual(sorted(ids), list(range(1, workers * count + 1)))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requiere fork")
+    def test_concurrent_processes_snapshot(self):
+        self.run_writers(journal=False)
+        document = json.load(open(self.filename, encoding='utf-8'))
+        self.assertEqual(document["version"], 120)
+        self.assert_complete(HotelManager(self.filename))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requiere fork")
+    def test_concurrent_processes_journal(self):
+        self.run_writers(journal=True)
+        self.assert_complete(HotelManager(self.filename, journal=True))
+
+    def test_refresh_reads_only_new_journal_records(self):
+        reader = HotelManager(self.filename, journal=True, shared=True)
+        writer = HotelManager(self.filename, journal=True, shared=True)
+        hotel = writer.create_hotel("Hotel A", "Leon")
+        self.assertTrue(reader.refresh())
+        self.assertEqual([h.name for h in reader.hotels], ["Hotel A"])
+        reader_hotel = reader.hotels[0]
+        RoomManager().create_room(writer, hotel, 1, "Suite", 2, 900)
+        with mock.patch.object(reader, "load_hotels") as load:
+            self.assertTrue(reader.refresh())
+            self.assertFalse(reader.refresh())
+        load.assert_not_called()
+        # El hotel ya cargado se actualiza en su lugar
+        self.assertIs(reader.hotels[0], reader_hotel)
+        self.assertEqual(len(reader_hotel.rooms), 1)
+
+    def test_reload_keeps_hotel_objects(self):
+        first = HotelManager(self.filename, shared=True)
+        second = HotelManager(self.filename, shared=True)
+        room_manager = RoomManager()
+        hotel = first.create_hotel("Hotel A", "Leon")
+        other = second.create_hotel("Hotel B", "Leon")
+        room_manager.create_room(first, hotel, 1, "Suite", 2, 900)
+        self.assertEqual([room.number for room in hotel.rooms], [1])
+        self.assertEqual(room_manager.search_rooms_by_hotel_type_and_price(hotel, "Suite", 1000),
+                         hotel.rooms)
+        # Otro proceso cambia el hotel: el objeto se actualiza en su lugar.
+        room_manager.create_room(second, second.get_hotel(hotel.hotel_id), 2, "Suite", 2, 800)
+        with mock.patch.object(Hotel, "from_dict", wraps=Hotel.from_dict) as from_dict:
+            reservation = first.create_reservation(hotel, hotel.rooms[0], "Ana")
+        # Solo se construye el hotel que cambio.
+        self.assertEqual(from_dict.call_count, 1)
+        self.assertIs(first.hotels[0], hotel)
+        self.assertIs(reservation.hotel, hotel)
+        self.assertEqual([room.number for room in hotel.rooms], [1, 2])
+        self.assertEqual([room.price for room in room_manager.search_rooms_by_hotel_type_and_price(
+            hotel, "Suite", 1000)], [800, 900])
+        second.create_hotel("Hotel C", "Leon")
+        with mock.patch.object(Hotel, "from_dict", wraps=Hotel.from_dict) as from_dict:
+            room_manager.create_room(first, hotel, 3, "Suite", 2, 700)
+        # Hotel A y Hotel B no cambiaron: se conservan sin construirse de nuevo.
+        self.assertEqual(from_dict.call_count, 1)
+        self.assertEqual(len(hotel.rooms), 3)
+        self.assertEqual(other.name, "Hotel B")
+
+    def test_stale_writer_merges_before_writing(self):
+        first = HotelManager(self.filename, shared=True)
+        second = HotelManager(self.filename, shared=True)
+        first.create_hotel("Hotel A", "Leon")
+        second.create_hotel("Hotel B", "Leon")
+        self.assertEqual([h.name for h in HotelManager(self.filename).hotels],
+                         ["Hotel A", "Hotel B"])
+
+
+class TestAvailability(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+        self.hotel_manager = HotelManager(self.filename, journal=True)
+        self.room_manager = RoomManager()
+        self.hotel = self.hotel_manager.create_hotel("Hotel Fechas", "Cancun")
+        self.rooms = self.room_manager.create_rooms(
+            self.hotel_manager, self.hotel,
+            [(1, "Suite", 2, 3000), (2, "Suite", 2, 2000), (3, "Standard", 2, 800)])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_overlapping_reservation_rejected(self):
+        room = self.rooms[0]
+        first = self.hotel_manager.create_reservation(
+            self.hotel, room, "Ana", "2024-03-01", "2024-03-05")
+        # La salida es exclusiva: el mismo dia puede entrar otro huesped
+        second = self.hotel_manager.create_reservation(
+            self.hotel, room, "Luis", "2024-03-05", "2024-03-08")
+        self.assertIsNot(first, second)
+        overlap = self.hotel_manager.create_reservation(
+            self.hotel, room, "Eva", "2024-03-04", "2024-03-06")
+        self.assertIn(overlap, (first, second))
+        self.assertEqual(len(self.hotel.reservations), 2)
+        with self.assertRaises(ValueError):
+            self.hotel_manager.create_reservation(
+                self.hotel, room, "Eva", "2024-03-10", "2024-03-09")
+
+    def test_find_available_rooms(self):
+        self.hotel_manager.create_reservation(
+            self.hotel, self.rooms[1], "Ana", "2024-03-01", "2024-03-05")
+        available = self.hotel_manager.find_available_rooms(
+            self.hotel, "2024-03-03", "2024-03-04", room_type="Suite")
+        self.assertEqual(available, [self.rooms[0]])
+        available = self.hotel_manager.find_available_rooms(
+            self.hotel, "2024-03-05", "2024-03-06", room_type="Suite", max_price=2500)
+        self.assertEqual(available, [self.rooms[1]])
+        available = self.hotel_manager.find_available_rooms(
+            self.hotel, "2024-03-03", "2024-03-04", max_price=1000)
+        self.assertEqual(available, [self.rooms[2]])
+
+    def test_undated_reservation_blocks_room(self):
+        self.hotel_manager.create_reservation(self.hotel, self.rooms[2], "Ana")
+        self.assertEqual(self.hotel_manager.find_available_rooms(
+            self.hotel, "2030-01-01", "2030-01-02", room_type="Standard"), [])
+
+    def test_dates_survive_replay(self):
+        self.hotel_manager.create_reservation(
+            self.hotel, self.rooms[0], "Ana", "2024-03-01", "2024-03-05")
+        reloaded = HotelManager(self.filename, journal=True)
+        hotel = reloaded.hotels[0]
+        room = RoomManager().get_room_by_number(hotel, 1)
+        self.assertEqual(str(hotel.reservations[0].check_out), "2024-03-05")
+        self.assertFalse(hotel.is_available(room, "2024-03-04", "2024-03-06"))
+
+
+class TestLazyLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+        hotel_manager = HotelManager(self.filename)
+        room_manager = RoomManager()
+        with hotel_manager.batch():
+            for index in range(3):
+                hotel = hotel_manager.create_hotel(f"Hotel {index}", f"Ciudad {index % 2}")
+                rooms = room_manager.create_rooms(
+                    hotel_manager, hotel, [(1, "Suite", 2, 1000 + index), (2, "Standard", 2, 500)])
+                hotel_manager.create_reservation(hotel, rooms[0], f"Huésped {index}")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hotels_are_built_on_first_use(self):
+        hotel_manager = HotelManager(self.filename, lazy=True)
+        self.assertEqual([hotel.name for hotel in hotel_manager.hotels],
+                         ["Hotel 0", "Hotel 1", "Hotel 2"])
+        self.assertEqual(len(hotel_manager.search_hotels_by_location("Ciudad 0")), 2)
+        self.assertFalse(any(hotel.loaded for hotel in hotel_manager.hotels))
+
+        hotel = hotel_manager.hotels[1]
+        room = RoomManager().get_room_by_number(hotel, 1)
+        self.assertEqual(room.price, 1001)
+        self.assertEqual(hotel.reservations[0].guest_name, "Huésped 1")
+        self.assertTrue(hotel.loaded)
+        self.assertFalse(hotel_manager.hotels[0].loaded)
+        self.assertEqual(hotel_manager.search_reservation_by_id(3).hotel.name, "Hotel 2")
+
+    def test_save_keeps_unloaded_hotels(self):
+        hotel_manager = HotelManager(self.filename, lazy=True)
+        hotel = hotel_manager.hotels[0]
+        room = RoomManager().get_room_by_number(hotel, 2)
+        reservation = hotel_manager.create_reservation(hotel, room, "Ana")
+        self.assertEqual(reservation.reservation_id, 4)
+        hotel_manager.create_hotel("Hotel Nuevo", "Ciudad 0")
+        self.assertFalse(hotel_manager.hotels[2].loaded)
+        # El hotel diferido ahora se lee del snapshot recien escrito
+        self.assertEqual(hotel_manager.hotels[2].reservations[0].guest_name, "Huésped 2")
+
+        reloaded = HotelManager(self.filename)
+        self.assertEqual([h.to_dict() for h in reloaded.hotels],
+                         [h.to_dict() for h in hotel_manager.hotels])
+
+    def test_scanner_reads_small_chunks(self):
+        with open(self.filename, 'rb') as file:
+            expected = json.load(file)
+        with open(self.filename, 'rb') as file:
+            scanner = SnapshotScanner(file, chunk_size=7)
+            hotels = [data for _, _, data in scanner.hotels()]
+        self.assertEqual(hotels, expected["hotels"])
+        self.assertEqual(scanner.meta["version"], expected["version"])
+
+    def test_utf8_snapshot(self):
+        document = {"format": 2, "version": 1, "hotels": [
+            {"name": "Hotel Ñandú", "location": "Mérida", "rooms": [],
+             "reservations": []}]}
+        with open(self.filename, 'w', encoding='utf-8') as file:
+            json.dump(document, file, ensure_ascii=False)
+        for lazy in (False, True):
+            hotel = HotelManager(self.filename, lazy=lazy).hotels[0]
+            self.assertEqual((hotel.name, hotel.location), ("Hotel Ñandú", "Mérida"))
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.hotel_manager = HotelManager(os.path.join(self.tmpdir.name, "hotels.json"))
+        self.room_manager = RoomManager()
+        self.hotel = self.hotel_manager.create_hotel("Hotel Cache", "Cancun")
+        self.other = self.hotel_manager.create_hotel("Hotel Otro", "Cancun")
+        for hotel in (self.hotel, self.other):
+            self.room_manager.create_rooms(self.hotel_manager, hotel,
+                                           [(1, "Suite", 2, 3000), (2, "Suite", 2, 2000)])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_room_query_invalidated_by_hotel_generation(self):
+        search = self.room_manager.search_rooms_by_hotel_type_and_price
+        first = search(self.hotel, "Suite", 2500)
+        self.assertEqual([room.number for room in first], [2])
+        first.clear()
+        self.assertEqual([room.number for room in search(self.hotel, "Suite", 2500)], [2])
+        search(self.other, "Suite", 2500)
+        self.assertEqual(self.room_manager.query_cache.stats()["hits"], 1)
+
+        self.room_manager.create_room(self.hotel_manager, self.hotel, 3, "Suite", 2, 1500)
+        self.assertEqual([room.number for room in search(self.hotel, "Suite", 2500)], [3, 2])
+        search(self.other, "Suite", 2500)
+        stats = self.room_manager.query_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 3))
+
+    def test_manager_queries(self):
+        self.assertEqual(len(self.hotel_manager.search_hotels_by_location("Cancun")), 2)
+        self.hotel_manager.create_hotel("Hotel Tres", "Cancun")
+        self.assertEqual(len(self.hotel_manager.search_hotels_by_location("Cancun")), 3)
+        self.assertEqual(self.hotel_manager.search_reservations_by_hotel(self.hotel), [])
+        reservation = self.hotel_manager.create_reservation(self.hotel, self.hotel.rooms[0], "Ana")
+        self.assertEqual(self.hotel_manager.search_reservations_by_hotel(self.hotel), [reservation])
+        self.assertEqual(self.hotel_manager.search_reservations_by_hotel(self.hotel), [reservation])
+        stats = self.hotel_manager.query_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 4))
+
+    def test_lru_eviction(self):
+        cache = QueryCache(capacity=2)
+        for key in ("a", "b", "a", "c", "b"):
+            cache.get(key, 0, lambda: key.upper())
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 4, "evictions": 2,
+                                         "size": 2, "capacity": 2})
+
+
+class TestGuestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+        self.hotel_manager = HotelManager(self.filename)
+        room_manager = RoomManager()
+        with self.hotel_manager.batch():
+            for index, guest in enumerate(["José García", "MARÍA  GARCÍA López", "Ana Garza"]):
+                hotel = self.hotel_manager.create_hotel(f"Hotel {index}", "Puebla")
+                room = room_manager.create_room(self.hotel_manager, hotel, 1, "Suite", 2, 900)
+                self.hotel_manager.create_reservation(hotel, room, guest, "2024-05-01", "2024-05-03")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _guests(self, name, prefix=False):
+        return sorted(reservation.guest_name for reservation in
+                      self.hotel_manager.search_reservations_by_guest(name, prefix))
+
+    def test_exact_and_prefix(self):
+        self.assertEqual(self._guests("jose garcia"), ["José García"])
+        self.assertEqual(self._guests("García"), [])
+        self.assertEqual(self._guests("Garc", prefix=True), ["José García", "MARÍA  GARCÍA López"])
+        self.assertEqual(self._guests("gar", prefix=True),
+                         ["Ana Garza", "José García", "MARÍA  GARCÍA López"])
+        self.assertEqual(self._guests("maria garcia l", prefix=True), ["MARÍA  GARCÍA López"])
+        self.assertEqual(self._guests("", prefix=True), [])
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self._guests("Garc", prefix=True), ["José García", "MARÍA  GARCÍA López"])
+        hotel = self.hotel_manager.hotels[2]
+        room = hotel.rooms[0]
+        with self.assertRaises(RuntimeError):
+            with self.hotel_manager.batch():
+                self.hotel_manager.create_reservation(hotel, room, "Luis Garcés",
+                                                      "2030-01-01", "2030-01-02")
+                self.assertEqual(len(self._guests("Garc", prefix=True)), 3)
+                raise RuntimeError("deshacer")
+        self.assertEqual(len(self._guests("Garc", prefix=True)), 2)
+        self.hotel_manager.delete_hotel(1)
+        self.assertEqual(self._guests("Garc", prefix=True), ["MARÍA  GARCÍA López"])
+
+    def test_lazy_reload(self):
+        reloaded = HotelManager(self.filename, lazy=True)
+        found = reloaded.search_reservations_by_guest("ana garza")
+        self.assertEqual([reservation.hotel.name for reservation in found], ["Hotel 2"])
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_operations_and_saves_are_recorded(self):
+        events = []
+        profiled = []
+        metrics = Metrics(sink=lambda kind, name, value: events.append((kind, name)),
+                          profiler=lambda call: profiled.append(call.func.__name__) or call())
+        hotel_manager = HotelManager(self.filename, metrics=metrics)
+        room_manager = RoomManager(metrics=metrics)
+        hotel = hotel_manager.create_hotel("Hotel Medido", "Oaxaca")
+        room = room_manager.create_room(hotel_manager, hotel, 1, "Suite", 2, 900)
+        reservation = hotel_manager.create_reservation(hotel, room, "Ana")
+        self.assertEqual(reservation.room, room)
+
+        stats = hotel_manager.stats()
+        operations = stats["operations"]
+        self.assertEqual(operations["HotelManager.create_reservation"]["calls"], 1)
+        self.assertEqual(operations["RoomManager.create_room"]["calls"], 1)
+        # find_reservation se mide aunque lo llame create_reservation.
+        self.assertEqual(operations["HotelManager.find_reservation"]["calls"], 1)
+        self.assertEqual(sum(operations["HotelManager.create_hotel"]["histogram"].values()), 1)
+        saves = stats["counters"]["save.bytes"]
+        self.assertEqual(saves["calls"], operations["save.disk"]["calls"])
+        self.assertGreaterEqual(saves["total"], os.path.getsize(self.filename))
+        self.assertIn(("count", "save.bytes"), events)
+        self.assertIn("query_cache", stats)
+        # El profiler solo envuelve la llamada mas externa.
+        self.assertNotIn("find_reservation", profiled)
+        self.assertIn("create_reservation", profiled)
+
+    def test_cprofile_runcall_as_profiler(self):
+        profile = cProfile.Profile()
+        hotel_manager = HotelManager(self.filename, metrics=Metrics(profiler=profile.runcall))
+        hotel = hotel_manager.create_hotel("Hotel Perfilado", "Oaxaca")
+        self.assertEqual(hotel_manager.search_hotels_by_location("Oaxaca"), [hotel])
+        functions = {function for _, _, function in pstats.Stats(profile).stats}
+        self.assertIn("create_hotel", functions)
+
+    def test_journal_and_disabled(self):
+        metrics = Metrics()
+        hotel_manager = HotelManager(self.filename, journal=True, metrics=metrics)
+        hotel_manager.create_hotel("Hotel Journal", "Oaxaca")
+        counters = metrics.stats()["counters"]
+        self.assertEqual(counters["journal.bytes"]["total"],
+                         os.path.getsize(hotel_manager.journal_filename))
+        self.assertNotIn("save.bytes", counters)
+
+        plain = HotelManager(self.filename)
+        self.assertNotIn("create_hotel", vars(plain))
+        self.assertEqual(plain.stats()["operations"], {})
+
+
+class TestHotelIds(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ids_survive_deletes_and_reloads(self):
+        hotel_manager = HotelManager(self.filename, journal=True)
+        hotels = [hotel_manager.create_hotel(f"Hotel {index}", "Tijuana") for index in range(4)]
+        self.assertEqual([hotel.hotel_id for hotel in hotels], [1, 2, 3, 4])
+        self.assertIs(hotel_manager.delete_hotel_by_id(2), hotels[1])
+        self.assertIsNone(hotel_manager.delete_hotel_by_id(2))
+        self.assertIs(hotel_manager.get_hotel(3), hotels[2])
+        self.assertIs(hotel_manager.get_hotel_by_index(2), hotels[2])
+        room = Room(1, "Suite", 2, 900)
+        hotel_manager.add_room(hotels[3], room)
+        hotel_manager.create_reservation(hotels[3], room, "Ana")
+        hotel_manager.delete_hotel_by_id(4)
+        with open(hotel_manager.journal_filename, encoding='utf-8') as file:
+            records = [json.loads(line) for line in file][1:]
+        self.assertEqual([record.get("hotel_id") for record in records], [1, 2, 3, 4, 2, 4, 4, 4])
+
+        reloaded = HotelManager(self.filename, journal=True)
+        self.assertEqual([hotel.hotel_id for hotel in reloaded.hotels], [1, 3])
+        reloaded.compact()
+        reloaded = HotelManager(self.filename, lazy=True)
+        self.assertEqual(reloaded.create_hotel("Hotel Nuevo", "Tijuana").hotel_id, 5)
+
+    def test_rollback_restores_position(self):
+        hotel_manager = HotelManager(self.filename)
+        for index in range(3):
+            hotel_manager.create_hotel(f"Hotel {index}", "Colima")
+        with self.assertRaises(RuntimeError):
+            with hotel_manager.batch():
+                hotel_manager.delete_hotel_by_id(2)
+                self.assertEqual([hotel.hotel_id for hotel in hotel_manager.hotels], [1, 3])
+                raise RuntimeError("deshacer")
+        self.assertEqual([hotel.hotel_id for hotel in hotel_manager.hotels], [1, 2, 3])
+        self.assertEqual(hotel_manager.hotels.index(hotel_manager.get_hotel(2)), 1)
+
+    def test_snapshot_without_ids_is_upgraded(self):
+        data = {"format": 2, "version": 1, "last_reservation_id": 0,
+                "hotels": [{"name": f"Hotel {index}", "location": "Colima",
+                            "rooms": [], "reservations": []} for index in range(3)]}
+        with open(self.filename, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        hotel_manager = HotelManager(self.filename, lazy=True)
+        self.assertEqual([hotel.hotel_id for hotel in hotel_manager.hotels], [1, 2, 3])
+        with open(self.filename, encoding='utf-8') as file:
+            saved = json.load(file)
+        self.assertEqual([hotel["hotel_id"] for hotel in saved["hotels"]], [1, 2, 3])
+        self.assertEqual(saved["last_hotel_id"], 3)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+import hotel_benchmark
+from hotel import HotelManager
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_generate_and_run_suite(self):
+        hotel_benchmark.generate(self.filename, 3, 4, 10)
+        with open(self.filename, 'rb') as file:
+            generated = file.read()
+        hotel_manager = HotelManager(self.filename)
+        # El archivo ya trae los ids: abrirlo no lo reescribe.
+        with open(self.filename, 'rb') as file:
+            self.assertEqual(file.read(), generated)
+        self.assertEqual([hotel.hotel_id for hotel in hotel_manager.hotels], [1, 2, 3])
+        self.assertEqual(hotel_manager.search_reservation_by_id(30).hotel.name, "Hotel 2")
+
+        # Mas operaciones que habitaciones: las reservaciones usan varios dias.
+        results = hotel_benchmark.run_suite(self.filename, 3, 4, 10, repeat=1, operations=20)
+        self.assertEqual(results["create_reservation"]["operations"], 20)
+        reloaded = HotelManager(self.filename)
+        self.assertEqual(sum(len(hotel.reservations) for hotel in reloaded.hotels), 30 + 2 * 20)
+        for name in ("load_hotels", "save_incremental", "search_reservation_by_id",
+                     "search_rooms_by_hotel_type_and_price", "search_reservations_by_guest"):
+            self.assertGreater(results[name]["throughput"], 0)
+            self.assertIn("peak_memory", results[name])
+        self.assertGreater(results["load_hotels"]["retained_memory"], 0)
+
+    def test_compare_reports_regressions(self):
+        baseline = {"small": {"load_hotels": {"seconds": 0.010, "peak_memory": 1000},
+                              "save_full": {"seconds": 0.0001}}}
+        results = {"small": {"load_hotels": {"seconds": 0.020, "peak_memory": 1000},
+                             "save_full": {"seconds": 0.0003},
+                             "search_rooms": {"seconds": 1.0}}}
+        regressions = hotel_benchmark.compare(results, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("small load_hotels"))
+        self.assertEqual(hotel_benchmark.compare(results, baseline, tolerance=1.5), [])
+        results["small"]["load_hotels"]["retained_memory"] = 10 ** 7
+        baseline["small"]["load_hotels"]["retained_memory"] = 10 ** 6
+        self.assertEqual(len(hotel_benchmark.compare(results, baseline, tolerance=1.5)), 1)
+        self.assertEqual(hotel_benchmark.parse_size("10x20x5"), (10, 20, 5))
+        self.assertEqual(hotel_benchmark.parse_size("10x0x0"), (10, 0, 0))
+        for size in ("0x5x3", "5x0x3", "5x-1x0", "5x5"):
+            with self.assertRaises(ValueError):
+                hotel_benchmark.parse_size(size)
+
+
+if __name__ == '__main__':
+    unittest.main()
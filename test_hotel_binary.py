@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+
+import hotel_binary
+from hotel import HotelManager, RoomManager
+
+
+class TestBinarySnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+        self.binary_filename = os.path.join(self.tmpdir.name, "hotels.bin")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _populate(self, hotel_manager):
+        room_manager = RoomManager()
+        with hotel_manager.batch():
+            hotel = hotel_manager.create_hotel("Hotel Ñandú", "Mérida")
+            rooms = room_manager.create_rooms(hotel_manager, hotel,
+                                              [(1, "Suite", 2, 3000), ("2B", "Standard", 1, 850.5)])
+            hotel_manager.create_reservation(hotel, rooms[0], "Ana", "2024-03-01", "2024-03-05")
+            hotel_manager.create_reservation(hotel, rooms[1], "Luis")
+            other = hotel_manager.create_hotel("Hotel Centro", "Mérida")
+            room_manager.create_room(hotel_manager, other, 10, "Suite", 4, 4200)
+
+    def test_binary_round_trip(self):
+        hotel_manager = HotelManager(self.binary_filename, binary=True)
+        self._populate(hotel_manager)
+        self.assertTrue(hotel_binary.is_binary(self.binary_filename))
+
+        reloaded = HotelManager(self.binary_filename, lazy=True)
+        self.assertEqual([hotel.name for hotel in reloaded.hotels], ["Hotel Ñandú", "Hotel Centro"])
+        self.assertFalse(any(hotel.loaded for hotel in reloaded.hotels))
+        self.assertEqual([hotel.to_dict() for hotel in reloaded.hotels],
+                         [hotel.to_dict() for hotel in hotel_manager.hotels])
+        hotel = reloaded.hotels[0]
+        room = RoomManager().get_room_by_number(hotel, 1)
+        self.assertFalse(hotel.is_available(room, "2024-03-04", "2024-03-06"))
+        self.assertEqual(reloaded.search_reservation_by_id(2).guest_name, "Luis")
+
+    def test_binary_journal_replay(self):
+        hotel_manager = HotelManager(self.binary_filename, journal=True, binary=True)
+        self._populate(hotel_manager)
+        hotel_manager.compact()
+        hotel = hotel_manager.hotels[1]
+        reservation = hotel_manager.create_reservation(hotel, hotel.rooms[0], "Eva")
+        self.assertEqual(reservation.reservation_id, 3)
+
+        reloaded = HotelManager(self.binary_filename, journal=True, binary=True)
+        self.assertEqual(reloaded.hotels[1].reservations[0].guest_name, "Eva")
+
+    def test_convert_both_directions(self):
+        hotel_manager = HotelManager(self.filename)
+        self._populate(hotel_manager)
+        self.assertTrue(hotel_binary.convert(self.filename, self.binary_filename))
+        self.assertLess(os.path.getsize(self.binary_filename), os.path.getsize(self.filename))
+        json_filename = os.path.join(self.tmpdir.name, "copia.json")
+        self.assertFalse(hotel_binary.convert(self.binary_filename, json_filename))
+        with open(self.filename, encoding='utf-8') as file:
+            original = json.load(file)
+        with open(json_filename, encoding='utf-8') as file:
+            converted = json.load(file)
+        self.assertEqual(converted["hotels"], original["hotels"])
+        self.assertEqual(converted["last_reservation_id"], 2)
+
+    def test_convert_does_not_modify_source(self):
+        legacy = [{"name": f"Hotel {index}", "location": "Leon",
+                   "rooms": [{"number": 1, "room_type": "Suite", "capacity": 2, "price": 900}],
+                   "reservations": []} for index in range(2)]
+        with open(self.filename, 'w', encoding='utf-8') as file:
+            json.dump(legacy, file)
+        with open(self.filename, 'rb') as file:
+            original = file.read()
+        self.assertTrue(hotel_binary.convert(self.filename, self.binary_filename))
+        with open(self.filename, 'rb') as file:
+            self.assertEqual(file.read(), original)
+        converted = HotelManager(self.binary_filename)
+        self.assertEqual([hotel.hotel_id for hotel in converted.hotels], [1, 2])
+        self.assertEqual(converted.hotels[1].rooms[0].price, 900)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import hotel
+from hotel import HotelManager, RoomManager
+from hotel_bulk import BulkLoader
+
+
+class TestBulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "hotels.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return path
+
+    def test_load_jsonl(self):
+        operations = [{"op": "create_hotel", "name": "Hotel A", "location": "Cancun"}]
+        operations += [{"op": "create_room", "hotel": "Hotel A", "number": number,
+                        "room_type": "Standard", "capacity": 2, "price": 500}
+                       for number in range(1, 101)]
+        operations += [{"op": "create_reservation", "hotel": "Hotel A", "room": 1,
+                        "guest_name": "Ana", "check_in": "2024-01-01", "check_out": "2024-01-03"},
+                       {"op": "create_reservation", "hotel": "Hotel A", "room": 1,
+                        "guest_name": "Luis", "check_in": "2024-01-02", "check_out": "2024-01-04"},
+                       {"op": "create_room", "hotel": "Hotel B", "number": 1,
+                        "room_type": "Suite", "capacity": 2, "price": 900},
+                       {"op": "create_hotel", "name": "Hotel C"}]
+        lines = "\n".join(json.dumps(operation) for operation in operations)
+        path = self.write("ops.jsonl", lines + "\n{roto\n")
+        hotel_manager = HotelManager(self.filename)
+        loader = BulkLoader(hotel_manager, chunk_size=25)
+        with mock.patch.object(hotel_manager, "_write_snapshot",
+                               wraps=hotel_manager._write_snapshot) as save:
+            summary = loader.load(path)
+        self.assertEqual(summary["lines"], 106)
+        self.assertEqual(summary["applied"], 102)
+        self.assertEqual(summary["errors"], 4)
+        self.assertEqual([line for line, _ in summary["error_lines"]], [103, 104, 105, 106])
+        # Un solo guardado por bloque de 25 operaciones
+        self.assertEqual(save.call_count, 5)
+        reloaded = HotelManager(self.filename)
+        self.assertEqual(len(reloaded.hotels[0].rooms), 100)
+        self.assertEqual(len(reloaded.hotels[0].reservations), 1)
+
+    def test_load_csv_and_delete(self):
+        path = self.write("ops.csv", "\n".join([
+            "op,hotel,name,location,number,room_type,capacity,price,room,guest_name,check_in,check_out",
+            "create_hotel,,Hotel A,Leon,,,,,,,,",
+            "create_hotel,,Hotel B,Leon,,,,,,,,",
+            "create_room,Hotel B,,,101,Suite,2,1500.5,,,,",
+            "create_room,Hotel B,,,102,Suite,dos,1500,,,,",
+            "create_reservation,Hotel B,,,,,,,101,Eva,2024-02-01,2024-02-02",
+            "delete_hotel,Hotel A,,,,,,,,,,",
+        ]) + "\n")
+        hotel_manager = HotelManager(self.filename)
+        summary = BulkLoader(hotel_manager).load(path)
+        self.assertEqual(summary["applied"], 5)
+        self.assertEqual([line for line, _ in summary["error_lines"]], [5])
+        self.assertEqual([h.name for h in hotel_manager.hotels], ["Hotel B"])
+        room = RoomManager().get_room_by_number(hotel_manager.hotels[0], 101)
+        self.assertEqual(room.price, 1500.5)
+        self.assertEqual(hotel_manager.hotels[0].reservations[0].guest_name, "Eva")
+
+    def test_failed_line_is_rolled_back(self):
+        path = self.write("ops.jsonl", "\n".join(json.dumps(operation) for operation in [
+            {"op": "create_hotel", "name": "Hotel A", "location": "Leon"},
+            {"op": "create_hotel", "name": "Hotel B", "location": ["x"]},
+            {"op": "create_hotel", "name": "Hotel C", "location": "Leon"},
+            {"op": "create_hotel", "name": "Hotel D", "location": "Leon"}]) + "\n")
+        hotel_manager = HotelManager(self.filename)
+        commit = hotel_manager._commit
+
+        def fail_after_change(record):
+            # Falla despues de modificar memoria, como un error a media operacion.
+            if record.get("name") == "Hotel C":
+                raise ValueError("falla simulada")
+            commit(record)
+
+        with mock.patch.object(hotel_manager, "_commit", side_effect=fail_after_change):
+            summary = BulkLoader(hotel_manager).load(path)
+        self.assertEqual([line for line, _ in summary["error_lines"]], [2, 3])
+        self.assertEqual([h.name for h in hotel_manager.hotels], ["Hotel A", "Hotel D"])
+        reloaded = HotelManager(self.filename)
+        self.assertEqual([h.name for h in reloaded.hotels], ["Hotel A", "Hotel D"])
+
+    def test_conflicts_do_not_print(self):
+        path = self.write("ops.jsonl", "\n".join(json.dumps(operation) for operation in [
+            {"op": "create_hotel", "name": "Hotel A", "location": "Leon"},
+            {"op": "create_room", "hotel": "Hotel A", "number": 1, "room_type": "Suite",
+             "capacity": 2, "price": 900},
+            {"op": "create_reservation", "hotel": "Hotel A", "room": 1, "guest_name": "Ana"},
+            {"op": "create_reservation", "hotel": "Hotel A", "room": 1, "guest_name": "Luis"}]) + "\n")
+        hotel_manager = HotelManager(self.filename)
+        with mock.patch("builtins.print") as printed, \
+                mock.patch("sys.stdout") as stdout:
+            summary = BulkLoader(hotel_manager).load(path)
+        printed.assert_not_called()
+        stdout.write.assert_not_called()
+        self.assertEqual(summary["error_lines"],
+                         [(4, "Ya existe una reserva para esta habitación.")])
+
+    def test_bulk_command(self):
+        path = self.write("ops.jsonl", json.dumps(
+            {"op": "create_hotel", "name": "Hotel A", "location": "Leon"}) + "\n")
+        with mock.patch("builtins.print"):
+            hotel.main(["--file", self.filename, "--journal", "bulk", path])
+        self.assertEqual(len(HotelManager(self.filename, journal=True).hotels), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from hotel import HotelManager
+from hotel_server import HotelServer, RateLimiter
+
+
+class TestHotelServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        # Servidor en un puerto libre de localhost
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.hotel_manager = HotelManager(os.path.join(self.tmpdir.name, "hotels.json"))
+        self.server = await HotelServer(self.hotel_manager).start()
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        self.next_id = 0
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.server.close()
+        self.tmpdir.cleanup()
+
+    async def send(self, op, **args):
+        self.next_id += 1
+        request = {"id": self.next_id, "op": op, "args": args}
+        self.writer.write(json.dumps(request).encode('utf-8') + b"\n")
+        await self.writer.drain()
+        return self.next_id
+
+    async def receive(self, count):
+        responses = {}
+        for _ in range(count):
+            response = json.loads(await self.reader.readline())
+            responses[response["id"]] = response
+        return responses
+
+    async def call(self, op, **args):
+        request_id = await self.send(op, **args)
+        return (await self.receive(1))[request_id]
+
+    async def test_create_and_search(self):
+        response = await self.call("create_hotel", name="Hotel Red", location="Cancun")
+        self.assertEqual(response["result"],
+                         {"hotel_id": 1, "name": "Hotel Red", "location": "Cancun"})
+        await self.call("create_room", hotel=1, number=1, room_type="Suite", capacity=2, price=900)
+        response = await self.call("create_reservation", hotel=1, room=1, guest_name="Ana",
+                                   check_in="2024-01-01", check_out="2024-01-03")
+        self.assertTrue(response["ok"])
+        reservation_id = response["result"]["reservation_id"]
+        response = await self.call("search_reservation_by_id", reservation_id=reservation_id)
+        self.assertEqual(response["result"]["guest_name"], "Ana")
+        response = await self.call("search_reservations_by_guest", guest_name="an", prefix=True)
+        self.assertEqual([found["reservation_id"] for found in response["result"]],
+                         [reservation_id])
+        response = await self.call("find_available_rooms", hotel=1,
+                                   check_in="2024-01-02", check_out="2024-01-04")
+        self.assertEqual(response["result"], [])
+        response = await self.call("search_hotels_by_location", location="Cancun")
+        self.assertEqual(len(response["result"]), 1)
+        response = await self.call("search_reservations_by_hotel", hotel_id=1)
+        self.assertEqual(len(response["result"]), 1)
+        response = await self.call("delete_hotel", hotel_id=1)
+        self.assertTrue(response["ok"])
+        response = await self.call("delete_hotel", hotel_id=1)
+        self.assertFalse(response["ok"])
+        response = await self.call("stats")
+        self.assertEqual(response["result"]["operations"], {})
+        self.assertIn("hits", response["result"]["query_cache"])
+
+    async def test_errors_are_reported(self):
+        response = await self.call("create_room", hotel=5, number=1, room_type="Suite",
+                                   capacity=2, price=900)
+        self.assertFalse(response["ok"])
+        response = await self.call("drop_everything")
+        self.assertFalse(response["ok"])
+        self.writer.write(b"{no es json\n")
+        response = json.loads(await self.reader.readline())
+        self.assertFalse(response["ok"])
+
+    async def test_failed_write_is_rolled_back(self):
+        await self.call("create_hotel", name="Hotel Red", location="Cancun")
+        await self.call("create_room", hotel=1, number=1, room_type="Suite", capacity=2, price=900)
+        response = await self.call("create_room", hotel=1, number=2, room_type="Suite",
+                                   capacity=2, price="cien")
+        self.assertFalse(response["ok"])
+        response = await self.call("create_hotel", name="Hotel Azul", location=["x"])
+        self.assertFalse(response["ok"])
+        await self.call("create_hotel", name="Hotel Verde", location="Cancun")
+        self.assertEqual([room.number for room in self.hotel_manager.hotels[0].rooms], [1])
+        reloaded = HotelManager(self.hotel_manager.filename)
+        self.assertEqual([hotel.name for hotel in reloaded.hotels], ["Hotel Red", "Hotel Verde"])
+
+    async def test_reservation_conflict_is_an_error(self):
+        await self.call("create_hotel", name="Hotel Red", location="Cancun")
+        await self.call("create_room", hotel=1, number=1, room_type="Suite", capacity=2, price=900)
+        response = await self.call("create_reservation", hotel=1, room=1, guest_name="Ana",
+                                   check_in="2024-01-01", check_out="2024-01-03")
+        self.assertTrue(response["ok"])
+        response = await self.call("create_reservation", hotel=1, room=1, guest_name="Mallory",
+                                   check_in="2024-01-02", check_out="2024-01-04")
+        self.assertFalse(response["ok"])
+        self.assertNotIn("result", response)
+        self.assertIn("Ya existe", response["error"])
+        self.assertEqual([reservation.guest_name
+                          for reservation in self.hotel_manager.hotels[0].reservations], ["Ana"])
+
+    async def test_writes_in_same_tick_are_coalesced(self):
+        with mock.patch.object(self.hotel_manager, "_write_snapshot",
+                               wraps=self.hotel_manager._write_snapshot) as save:
+            ids = [await self.send("create_hotel", name=f"Hotel {index}", location="Leon")
+                   for index in range(20)]
+            responses = await self.receive(len(ids))
+        self.assertTrue(all(responses[request_id]["ok"] for request_id in ids))
+        self.assertEqual(len(self.hotel_manager.hotels), 20)
+        self.assertLess(save.call_count, 20)
+
+    async def test_rate_limit(self):
+        self.server.rate_limit = 1
+        self.server.burst = 2
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        for request_id in range(5):
+            writer.write(json.dumps({"id": request_id, "op": "list_hotels"}).encode() + b"\n")
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(5)]
+        self.assertEqual(sum(1 for response in responses if response["ok"]), 2)
+        writer.close()
+        await writer.wait_closed()
+
+    def test_rate_limiter_burst(self):
+        limiter = RateLimiter(0.5)
+        self.assertTrue(limiter.allow())
+        self.assertFalse(limiter.allow())
+        with self.assertRaises(ValueError):
+            RateLimiter(5, burst=0.5)
+
+    async def test_writes_are_not_timed_out(self):
+        self.server.request_timeout = 0.01
+        apply_writes = self.server._apply_writes
+
+        def slow_apply(writes):
+            time.sleep(0.2)
+            return apply_writes(writes)
+
+        with mock.patch.object(self.server, "_apply_writes", slow_apply):
+            response = await self.call("create_hotel", name="Hotel Lento", location="Leon")
+        self.assertTrue(response["ok"])
+        self.assertEqual([hotel.name for hotel in self.hotel_manager.hotels], ["Hotel Lento"])
+
+    async def test_read_timeout(self):
+        self.server.request_timeout = 0.01
+
+        def slow_list():
+            time.sleep(0.2)
+            return []
+
+        with mock.patch.object(self.server, "_list_hotels", slow_list):
+            response = await self.call("list_hotels")
+        self.assertFalse(response["ok"])
+        self.assertIn("Tiempo", response["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+from hotel import RoomManager
+from hotel_shards import LocationRouter, ShardedHotelManager
+
+
+class TestShardedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, "hotels")
+        self.room_manager = RoomManager()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _populate(self, hotel_manager):
+        with hotel_manager.batch():
+            for index, location in enumerate(["Cancun", "Mérida", "Cancun", "Puebla"]):
+                hotel = hotel_manager.create_hotel(f"Hotel {index}", location)
+                self.room_manager.create_rooms(
+                    hotel_manager, hotel,
+                    [(1, "Suite", 2, 1000 + index * 10), (2, "Standard", 2, 400 + index)])
+
+    @staticmethod
+    def _shard(location):
+        return f"shard-{LocationRouter().key(location)}.json"
+
+    def _files(self):
+        return {name: os.stat(os.path.join(self.directory, name)).st_ino
+                for name in os.listdir(self.directory)}
+
+    def test_location_shards(self):
+        hotel_manager = ShardedHotelManager(self.directory, workers=1)
+        self._populate(hotel_manager)
+        self.assertEqual(set(self._files()),
+                         {"shards.json", self._shard("Cancun"), self._shard("Mérida"),
+                          self._shard("Puebla")})
+
+        reloaded = ShardedHotelManager(self.directory, workers=1, lazy=True)
+        self.assertEqual([hotel.name for hotel in reloaded.hotels],
+                         ["Hotel 0", "Hotel 1", "Hotel 2", "Hotel 3"])
+        self.assertEqual([hotel.to_dict() for hotel in reloaded.hotels],
+                         [hotel.to_dict() for hotel in hotel_manager.hotels])
+
+    def test_location_keys_are_case_safe_and_short(self):
+        hotel_manager = ShardedHotelManager(self.directory, workers=1)
+        long_location = "Ciudad de " + "Ñuñoa " * 60
+        for location in ("Cancun", "cancun", long_location):
+            hotel_manager.create_hotel(f"Hotel {location[:10]}", location)
+        names = [name for name in self._files() if name.startswith("shard-")]
+        self.assertEqual(len({name.lower() for name in names}), 3)
+        self.assertTrue(all(len(name.encode('utf-8')) < 64 for name in names))
+        reloaded = ShardedHotelManager(self.directory, workers=1)
+        self.assertEqual([hotel.location for hotel in reloaded.hotels],
+                         ["Cancun", "cancun", long_location])
+
+    def test_previous_location_keys_are_repartitioned(self):
+        class PreviousRouter:
+            spec = {"router": "location"}
+
+            @staticmethod
+            def key(location):
+                return location
+
+        self._populate(ShardedHotelManager(self.directory, PreviousRouter(), workers=1))
+        self.assertIn("shard-Cancun.json", self._files())
+        hotel_manager = ShardedHotelManager(self.directory, workers=1)
+        self.assertEqual({name for name in self._files() if name.startswith("shard-")},
+                         {self._shard("Cancun"), self._shard("Mérida"), self._shard("Puebla")})
+        self.assertEqual([hotel.name for hotel in hotel_manager.search_hotels_by_location("Cancun")],
+                         ["Hotel 0", "Hotel 2"])
+
+    def test_write_rewrites_only_affected_shard(self):
+        hotel_manager = ShardedHotelManager(self.directory, workers=1)
+        self._populate(hotel_manager)
+        before = self._files()
+        hotel = hotel_manager.hotels[1]
+        hotel_manager.create_reservation(hotel, hotel.rooms[0], "Ana")
+        after = self._files()
+        changed = {name for name in after if after[name] != before[name]}
+        self.assertEqual(changed, {self._shard("Mérida")})
+
+        hotel_manager.delete_hotel(4)
+        self.assertNotIn(self._shard("Puebla"), self._files())
+        created = hotel_manager.create_hotel("Hotel Nuevo", "Cancun")
+        reloaded = ShardedHotelManager(self.directory, workers=1)
+        self.assertEqual([hotel.name for hotel in reloaded.hotels],
+                         ["Hotel 0", "Hotel 1", "Hotel 2", created.name])
+        self.assertEqual(reloaded.search_reservation_by_id(1).guest_name, "Ana")
+
+    def test_repartition_and_parallel_search(self):
+        self._populate(ShardedHotelManager(self.directory, workers=1))
+        hotel_manager = ShardedHotelManager(self.directory, shards=2, workers=2)
+        try:
+            names = {name for name in self._files() if name.startswith("shard-")}
+            self.assertLessEqual(len(names), 2)
+            with open(os.path.join(self.directory, "shards.json"), encoding='utf-8') as file:
+                manifest = json.load(file)
+            self.assertEqual((manifest["router"], manifest["count"]), ("hash", 2))
+            # Los shards borrados no se llevan el ultimo id de hotel.
+            self.assertEqual(manifest["last_hotel_id"], 4)
+            expected = [(hotel.name, room.number) for hotel, room in
+                        ShardedHotelManager(self.directory, 2, workers=1).search_rooms()]
+            found = hotel_manager.search_rooms()
+            self.assertEqual([(hotel.name, room.number) for hotel, room in found], expected)
+            self.assertEqual([room.price for _, room in found][:3], [400, 401, 402])
+            found = hotel_manager.search_rooms(room_type="Suite", location="Cancun", limit=1)
+            self.assertEqual([(hotel.name, room.price) for hotel, room in found],
+                             [("Hotel 0", 1000)])
+            self.assertIs(found[0][0], hotel_manager.hotels[0])
+        finally:
+            hotel_manager.close()
+
+    def test_parallel_search_after_write(self):
+        hotel_manager = ShardedHotelManager(self.directory, shards=2, workers=2)
+        try:
+            self._populate(hotel_manager)
+            self.assertEqual(len(hotel_manager.search_rooms(max_price=500)), 4)
+            self.room_manager.create_room(hotel_manager, hotel_manager.hotels[3], 3,
+                                          "Standard", 1, 100)
+            found = hotel_manager.search_rooms(max_price=500)
+            self.assertEqual(found[0][1].price, 100)
+            self.assertEqual(len(found), 5)
+        finally:
+            hotel_manager.close()
+
+    def test_write_during_parallel_search(self):
+        hotel_manager = ShardedHotelManager(self.directory, shards=2, workers=2)
+        self._populate(hotel_manager)
+        room_manager = self.room_manager
+        test = self
+
+        class WritingPool:
+            # Escribe desde otro hilo mientras la busqueda espera a los
+            # procesos; con los candados tomados durante la busqueda el
+            # hilo quedaria bloqueado.
+            def submit(self, function, *args):
+                if not hotel_manager.hotels[0].room_by_number(3):
+                    writer = threading.Thread(target=room_manager.create_room, args=(
+                        hotel_manager, hotel_manager.hotels[0], 3, "Standard", 1, 100))
+                    writer.start()
+                    writer.join(5)
+                    test.assertFalse(writer.is_alive())
+                future = Future()
+                future.set_result(function(*args))
+                return future
+
+        with mock.patch.object(hotel_manager, "_worker_pools",
+                               return_value=[WritingPool(), WritingPool()]):
+            found = hotel_manager.search_rooms(max_price=500)
+        self.assertEqual([(hotel.name, room.price) for hotel, room in found][:2],
+                         [("Hotel 0", 100), ("Hotel 0", 400)])
+        self.assertEqual(len(found), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()